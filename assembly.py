@@ -1,164 +1,255 @@
+import os
 import cadquery as cq
-import vslot
-import clamp as clamp_module
-import bracket as bracket_module
-import spindle as spindle_module
-import vac_brack as vac_brack_module
-import vac as vac_module
-import chimney as chimney_module
-import brace as brace_module
+import build
 import dims
-import importlib
-
-importlib.reload(dims)
-importlib.reload(clamp_module)
-importlib.reload(bracket_module)
-importlib.reload(spindle_module)
-importlib.reload(vac_brack_module)
-importlib.reload(vac_module)
-importlib.reload(chimney_module)
-importlib.reload(brace_module)
-
-# Looks like I'm asking too much from the solver to assemble all these
-# components in a top level assembly. I should try breaking these parts into
-# subassemblies to simplify the process.
-assy = cq.Assembly()
-
-back = vslot.cbeam_dxf(250)
-assy.add(back, name="back", color=cq.Color(0.8, 0.8, 0.8))
-assy.add(bracket_module.bracket, name="bracket", color=cq.Color(0.9, 0.9, 0.95))
-# Make the constraint between the centre of the bottom back edge of the bracket
-# and the centre of the bottom front edge of the back aluminium profile plus an
-# offset
-backpoint = (
-    back.faces("<Z", tag="unslotted")
-    .edges("<Y")
-    .translate((0, 0, dims.bottom_of_vslot_to_bottom_of_bracket))
-    .val()
-)
-bracketpoint = bracket_module.bracket.faces("<Z").edges(">Y").val()
-assy.constrain("back", backpoint, "bracket", bracketpoint, "Point")
-assy.constrain(
-    "back",
-    back.faces("<Y", tag="unslotted").val(),
-    "bracket",
-    bracket_module.bracket.faces(">Y").val(),
-    "Axis",
-)
-assy.constrain(
-    "back",
-    back.faces("<Z", tag="unslotted").val(),
-    "bracket",
-    bracket_module.bracket.faces(">Z").val(),
-    "Axis",
-)
-
-clamp = clamp_module.clamp.rotate((0, 0, 0), (0, 0, 1), 180)
-assy.add(clamp, name="clamp")
-assy.constrain("bracket@faces@<Y", "clamp@faces@>Y", "Plane")
-assy.constrain("bracket@faces@<Z", "clamp@faces@>Z", "Axis")
-
-spindle = spindle_module.spindle
-assy.add(spindle, name="spindle", color=cq.Color(0.9, 0.7, 0.8))
-spindle_lower_face = (
-    spindle.faces(cq.NearestToPointSelector((0, 0, dims.spindle.body.length / 2)))
-    .edges("<Z")
-    .val()
-)
-clamp_lower_face = clamp.faces("<Z").edges("%CIRCLE").val()
-assy.constrain(
-    "clamp",
-    clamp_lower_face,
-    "spindle",
-    spindle_lower_face.translate((0, 0, dims.spindle.body.clamp_end_offset)),
-    "Plane",
-)
-
-vac_brack = vac_brack_module.bracket
-assy.add(vac_brack, name="vac_brack", color=cq.Color(0.2, 0.2, 0.2, 0.8))
-backpoint2 = back.faces("<Z", tag="unslotted").edges("<Y").vertices(">X").val()
-vac_brack_point = vac_brack.faces("<Z").edges(">Y").vertices(">X").val()
-assy.constrain("back", backpoint2, "vac_brack", vac_brack_point, "Point")
-assy.constrain("back?unslotted@faces@<Z", "vac_brack@faces@>Z", "Axis")
-assy.constrain(
-    "back",
-    back.faces("<Y", tag="unslotted").val(),
-    "vac_brack",
-    vac_brack.faces(">Y").val(),
-    "Axis",
-)
-
-vac = vac_module.part
-assy.add(vac, name="vac", color=cq.Color(0.3, 0.2, 0.3, 0.8))
-vac_brack_front_bottom_left = vac_brack.faces("<Y").edges("<X").vertices("<Z").val()
-vac_back_bottom_left = vac.faces(">Y", tag="base").edges("<X").vertices("<Z").val()
-assy.constrain(
-    "vac_brack", vac_brack_front_bottom_left, "vac", vac_back_bottom_left, "Point"
-)
-assy.constrain(
-    "vac_brack",
-    vac_brack.faces("<Y").val(),
-    "vac",
-    vac.faces(">Y", tag="base").val(),
-    "Axis",
-)
-assy.constrain(
-    "vac_brack",
-    vac_brack.faces("<Z").val(),
-    "vac",
-    vac.faces("<Z").val(),
-    "Axis",
-    param=0,
-)
-
-chimney = chimney_module.chimney
-assy.add(chimney, name="chimney", color=cq.Color(0.3, 0.2, 0.3, 0.8))
-assy.constrain(
-    "vac",
-    vac.edges("%CIRCLE").edges(cq.NearestToPointSelector(dims.vac.hose.plane.origin)).val(),
-    "chimney",
-    chimney.faces("<Z").edges("%CIRCLE").val(),
-    "Plane",
-    param=0,
-)
-assy.constrain(
-    "back",
-    back.faces("<Y", tag="unslotted").val(),
-    "chimney",
-    chimney.faces(">(1, 1, 0)", tag="mountbase").val(),
-    "Axis",
-    param=180,
-)
-
-brace = brace_module.brace
-assy.add(brace, name="brace", color=cq.Color(0.3, 0.2, 0.3, 0.8))
-assy.constrain(
-    "chimney",
-    chimney.faces(">(1, 1, 0)", tag="mountbase").val(),
-    "brace",
-    brace.faces("<Y", tag="mountbase").val(),
-    "Plane",
-)
-assy.constrain(
-    "brace@faces@>Z",
-    "bracket@faces@<Z",
-    "Axis",
-    # param=180
-)
-
-try:
-    assy.solve()
-except Exception as e:
-    print(e)
-    raise e
-# # calculating the offset required for the brace's mounting face
-# unlocated_mount_face_centre = chimney.faces(">(1, 1, 0)", tag="mountbase").workplane().sphere(1, combine=False).val()
-# location = assy.objects["chimney"].loc
-# mount_face_centre = unlocated_mount_face_centre.move(location)
-# show_object(mount_face_centre)
-# mount_face_centre_vec = mount_face_centre.Center()
-# mount_face_centre_vec.z = 0
-# # to avoid a circular dependency, just copy and paste this into dims.py
-# print(f"brace mount face offset: {mount_face_centre_vec}")
-# # assert (cq.Vector(dims.brace.mount_face) - mount_face_centre).Length < 1e-4, "copy mount_face_centre to dims.py"
-show_object(assy)
+import document
+import mesh
+import placement
+import selection
+import solve
+
+# "closed form" puts the parts with offsets in dims.assembly straight into
+# place and only uses the solver for the chimney and brace, "solver" solves
+# everything
+placement_mode = "closed form"
+# print the residual of every constraint once the parts are placed
+verify = False
+
+# Asking the solver to place everything in one flat assembly was too much, the
+# numerical errors built up and the spindle wasn't quite centred in the
+# bracket. So the parts are split into two subassemblies that are solved on
+# their own (and cached, see solve.py), then the top level only has to place
+# the two groups against the back.
+
+
+def make_mount(parts):
+    """
+    The spindle mount: the bracket, clamp and spindle, relative to the
+    bracket. parts is what build.build() returns.
+    """
+    mount = cq.Assembly(name="mount")
+    bracket = parts["bracket"]
+    mount.add(bracket, name="bracket", color=cq.Color(0.9, 0.9, 0.95))
+    mount.constrain("bracket", "Fixed")
+
+    clamp = parts["clamp"].rotate((0, 0, 0), (0, 0, 1), 180)
+    mount.add(clamp, name="clamp")
+    mount.constrain("bracket@faces@<Y", "clamp@faces@>Y", "Plane")
+    mount.constrain("bracket@faces@<Z", "clamp@faces@>Z", "Axis")
+
+    spindle = parts["spindle"]
+    mount.add(spindle, name="spindle", color=cq.Color(0.9, 0.7, 0.8))
+    spindle_lower_face = (
+        spindle.faces(cq.NearestToPointSelector((0, 0, dims.spindle.body.length / 2)))
+        .edges("<Z")
+        .val()
+    )
+    clamp_lower_face = clamp.faces("<Z").edges("%CIRCLE").val()
+    mount.constrain(
+        "clamp",
+        clamp_lower_face,
+        "spindle",
+        spindle_lower_face.translate((0, 0, dims.spindle.body.clamp_end_offset)),
+        "Plane",
+    )
+    if placement_mode == "closed form":
+        placement.place(mount, "bracket", ["bracket", "clamp", "spindle"])
+    else:
+        solve.solve(mount)
+    return mount
+
+
+def make_vacuum(parts):
+    """
+    The vacuum parts: vac_brack, vac, chimney and brace, relative to
+    vac_brack.
+    """
+    vacuum = cq.Assembly(name="vacuum")
+    vac_brack = parts["vac_brack"]
+    vacuum.add(vac_brack, name="vac_brack", color=cq.Color(0.2, 0.2, 0.2, 0.8))
+    vacuum.constrain("vac_brack", "Fixed")
+
+    vac = parts["vac"]
+    vacuum.add(vac, name="vac", color=cq.Color(0.3, 0.2, 0.3, 0.8))
+    vac_brack_front_bottom_left = vac_brack.faces("<Y").edges("<X").vertices("<Z").val()
+    vac_back_bottom_left = vac.faces(">Y", tag="base").edges("<X").vertices("<Z").val()
+    vacuum.constrain(
+        "vac_brack", vac_brack_front_bottom_left, "vac", vac_back_bottom_left, "Point"
+    )
+    vacuum.constrain(
+        "vac_brack",
+        vac_brack.faces("<Y").val(),
+        "vac",
+        vac.faces(">Y", tag="base").val(),
+        "Axis",
+    )
+    # the bottom of the base rather than the bottom of the whole part, the
+    # kernel can leave a degenerate face of the ruled duct lowest, which
+    # points sideways
+    vacuum.constrain(
+        "vac_brack",
+        vac_brack.faces("<Z").val(),
+        "vac",
+        vac.faces("<Z", tag="base").val(),
+        "Axis",
+        param=0,
+    )
+    if placement_mode == "closed form":
+        placement.place(vacuum, "vac_brack", ["vac_brack", "vac"])
+        vacuum.constrain("vac", "Fixed")
+
+    chimney = parts["chimney"]
+    vacuum.add(chimney, name="chimney", color=cq.Color(0.3, 0.2, 0.3, 0.8))
+    vacuum.constrain(
+        "vac",
+        vac.edges("%CIRCLE").edges(cq.NearestToPointSelector(dims.vac.hose.plane.origin)).val(),
+        "chimney",
+        chimney.faces("<Z").edges("%CIRCLE").val(),
+        "Plane",
+        param=0,
+    )
+    # vac_brack's >Y face is held anti-parallel to the back's <Y face, so this is
+    # the same as the chimney's mount face being at 180 degrees to the back
+    vacuum.constrain(
+        "vac_brack",
+        vac_brack.faces(">Y").val(),
+        "chimney",
+        chimney.faces(">(1, 1, 0)", tag="mountbase").val(),
+        "Axis",
+        param=0,
+    )
+
+    brace = parts["brace"]
+    vacuum.add(brace, name="brace", color=cq.Color(0.3, 0.2, 0.3, 0.8))
+    vacuum.constrain(
+        "chimney",
+        chimney.faces(">(1, 1, 0)", tag="mountbase").val(),
+        "brace",
+        brace.faces("<Y", tag="mountbase").val(),
+        "Plane",
+    )
+    # the bottom of vac_brack faces the same way as the bottom of the bracket
+    vacuum.constrain(
+        "brace@faces@>Z",
+        "vac_brack@faces@<Z",
+        "Axis",
+        # param=180
+    )
+    solve.solve(vacuum)
+    return vacuum
+
+
+def make_top(parts, mount, vacuum):
+    """
+    The top level, the two groups placed against the back.
+    """
+    back = parts["back"]
+    bracket = parts["bracket"]
+    vac_brack = parts["vac_brack"]
+    assy = cq.Assembly(name="assembly")
+    assy.add(back, name="back", color=cq.Color(0.8, 0.8, 0.8))
+    assy.add(mount, name="mount")
+    assy.add(vacuum, name="vacuum")
+    # Make the constraint between the centre of the bottom back edge of the bracket
+    # and the centre of the bottom front edge of the back aluminium profile plus an
+    # offset
+    backpoint = (
+        back.faces("<Z", tag="unslotted")
+        .edges("<Y")
+        .translate((0, 0, dims.bottom_of_vslot_to_bottom_of_bracket))
+        .val()
+    )
+    bracketpoint = bracket.faces("<Z").edges(">Y").val()
+    assy.constrain("back", backpoint, "mount/bracket", bracketpoint, "Point")
+    assy.constrain(
+        "back",
+        back.faces("<Y", tag="unslotted").val(),
+        "mount/bracket",
+        bracket.faces(">Y").val(),
+        "Axis",
+    )
+    assy.constrain(
+        "back",
+        back.faces("<Z", tag="unslotted").val(),
+        "mount/bracket",
+        bracket.faces(">Z").val(),
+        "Axis",
+    )
+
+    backpoint2 = back.faces("<Z", tag="unslotted").edges("<Y").vertices(">X").val()
+    vac_brack_point = vac_brack.faces("<Z").edges(">Y").vertices(">X").val()
+    assy.constrain("back", backpoint2, "vacuum/vac_brack", vac_brack_point, "Point")
+    assy.constrain(
+        "back",
+        back.faces("<Z", tag="unslotted").val(),
+        "vacuum/vac_brack",
+        vac_brack.faces(">Z").val(),
+        "Axis",
+    )
+    assy.constrain(
+        "back",
+        back.faces("<Y", tag="unslotted").val(),
+        "vacuum/vac_brack",
+        vac_brack.faces(">Y").val(),
+        "Axis",
+    )
+
+    if placement_mode == "closed form":
+        locs = placement.locations()
+        assy.objects["mount"].loc = locs["bracket"]
+        assy.objects["vacuum"].loc = locs["vac_brack"]
+    else:
+        try:
+            solve.solve(assy)
+        except Exception as e:
+            print(e)
+            raise e
+    return assy
+
+
+def make(jobs=None, out=None):
+    """
+    Builds the parts, using up to jobs worker processes for the ones that
+    aren't in the cache (the number of CPUs by default), places them and
+    returns the top level assembly. The groups are assy.objects["mount"] and
+    assy.objects["vacuum"]. With out, the placed assembly is saved to
+    <out>/assembly.xbf as well (see document.py).
+    """
+    # this reloads dims too
+    parts = build.build(jobs=jobs or os.cpu_count())
+
+    # the same selectors get used on the same parts lots of times while the
+    # constraints are set up
+    with selection.memoised():
+        mount = make_mount(parts)
+        vacuum = make_vacuum(parts)
+        assy = make_top(parts, mount, vacuum)
+    if verify:
+        for group in (mount, vacuum, assy):
+            solve.report(group)
+    # # calculating the offset required for the brace's mounting face
+    # chimney = parts["chimney"]
+    # unlocated_mount_face_centre = chimney.faces(">(1, 1, 0)", tag="mountbase").workplane().sphere(1, combine=False).val()
+    # location = assy.objects["vacuum"].loc * assy.objects["vacuum/chimney"].loc
+    # mount_face_centre = unlocated_mount_face_centre.move(location)
+    # show_object(mount_face_centre)
+    # mount_face_centre_vec = mount_face_centre.Center()
+    # mount_face_centre_vec.z = 0
+    # # to avoid a circular dependency, just copy and paste this into dims.py
+    # print(f"brace mount face offset: {mount_face_centre_vec}")
+    # # assert (cq.Vector(dims.brace.mount_face) - mount_face_centre).Length < 1e-4, "copy mount_face_centre to dims.py"
+    if out is not None:
+        document.save(assy, os.path.join(out, "assembly.xbf"))
+    return assy
+
+
+# show_object is only defined when running in cq-editor, see cli.py for
+# building without it
+if "show_object" in globals():
+    # saved to out/assembly.xbf too, open document.py to look at it without
+    # building or solving anything
+    assy = make(out=os.path.dirname(document.default_path))
+    # give the parts cached meshes so they don't all get meshed again, see
+    # mesh.py
+    mesh.prepare(assy)
+    show_object(assy)
@@ -0,0 +1,308 @@
+"""
+Benchmarks for building the parts and solving the assembly.
+
+    python bench.py                       # run everything, print a table
+    python bench.py chimney vac -n 5      # benchmarks whose names contain these
+    python bench.py -o new.json           # save the results as json
+    python bench.py --compare base.json   # flag regressions against old results
+
+Every part is built from scratch (the cache in build.py is bypassed) and the
+time spent inside the expensive CadQuery operations during those builds
+(ruled surfaces, sweeps, lofts, fillets and booleans.cut_all) is recorded as
+a benchmark of its own, eg. "op/chimney/sweep". The DXF import,
+vac_helpers.kidney_and_circle_wires and a cold solve of each assembly are
+timed separately.
+
+Peak memory is the resident set size high water mark, which catches OCC's
+allocations as well as Python's. On Linux it is reset before each benchmark,
+elsewhere it is the peak for the whole process so far.
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import cadquery as cq
+import booleans
+import build
+import instrument
+import vac_helpers
+import vslot
+
+
+# (class or module, attribute, name in the results)
+operations = [
+    (cq.Face, "makeRuledSurface", "ruled surface"),
+    (cq.Workplane, "sweep", "sweep"),
+    (cq.Workplane, "loft", "loft"),
+    (cq.Workplane, "fillet", "fillet"),
+    (booleans, "cut_all", "cut_all"),
+]
+
+
+def _reset_peak():
+    """
+    Resets the RSS high water mark, returns False if it can't be done here.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / 1024 ** (2 if sys.platform == "darwin" else 1)
+
+
+class Recorder:
+    """
+    Wraps the functions in operations to add up the time spent in each of
+    them, while active.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self.names = {
+            f"{owner.__name__}.{attr}": name for owner, attr, name in operations
+        }
+
+    def _wrap(self, f, name):
+        name = self.names[name]
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                self.times[name] = (
+                    self.times.get(name, 0.0) + time.perf_counter() - t0
+                )
+        return wrapper
+
+    def __enter__(self):
+        self.times = {}
+        self._patch = instrument.patched(
+            [(owner, attr) for owner, attr, _ in operations], self._wrap
+        )
+        self._patch.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._patch.__exit__(*exc)
+
+
+def _summary(times, peak, peak_reset):
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "peak_rss_mb": peak,
+        "peak_rss_reset": peak_reset,
+    }
+
+
+def bench_part(name, repeats):
+    """
+    Builds the named part repeats times. Returns {benchmark name: summary}
+    for the build and each of the operations it used.
+    """
+    spec = build.parts[name]
+    peak_reset = _reset_peak()
+    times = []
+    ops = {}
+    for _ in range(repeats):
+        with Recorder() as recorder:
+            t0 = time.perf_counter()
+            spec.build()
+            times.append(time.perf_counter() - t0)
+        for op, seconds in recorder.times.items():
+            ops.setdefault(op, []).append(seconds)
+    peak = _peak_mb()
+    out = {f"build/{name}": _summary(times, peak, peak_reset)}
+    for op, op_times in sorted(ops.items()):
+        out[f"op/{name}/{op}"] = _summary(op_times, peak, peak_reset)
+    return out
+
+
+def bench_function(f, repeats):
+    peak_reset = _reset_peak()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+    return _summary(times, _peak_mb(), peak_reset)
+
+
+def _import_dxf():
+    cq.importers.importDXF(vslot.dxf_path)
+
+
+def _kidney_and_circle_wires():
+    """
+    Returns a function that makes the wires with the arguments vac.py uses.
+    """
+    import dims
+    import vac
+
+    args = (
+        dims.vac.hose.id / 2,
+        cq.Vector(dims.vac.hose.plane.origin),
+        *vac.port_radii(),
+    )
+    return lambda: vac_helpers.kidney_and_circle_wires(*args)
+
+
+def _cold_solve(group):
+    """
+    Solves group from scratch, every child starting at the origin.
+    """
+
+    def f():
+        for child in group.children:
+            child.loc = cq.Location()
+        group.solve()
+
+    return f
+
+
+def run(patterns=(), repeats=3):
+    """
+    Runs every benchmark whose name contains one of patterns (or all of
+    them), returns the results as a json-able dict.
+    """
+    results = {}
+
+    def wanted(name):
+        return not patterns or any(p in name for p in patterns)
+
+    for name in build.parts:
+        if wanted(f"build/{name}") or wanted(f"op/{name}/"):
+            print(f"bench: build/{name}", file=sys.stderr)
+            results.update(bench_part(name, repeats))
+    singles = [("import/dxf", _import_dxf)]
+    if wanted("vac_helpers/kidney_and_circle_wires"):
+        singles.append(
+            ("vac_helpers/kidney_and_circle_wires", _kidney_and_circle_wires())
+        )
+    if any(wanted(f"solve/{group}") for group in ("mount", "vacuum", "assembly")):
+        # the parts come through the cache and the constraints are set up
+        # here, the solves themselves are what gets timed
+        import assembly
+
+        parts = build.build()
+        mount = assembly.make_mount(parts)
+        vacuum = assembly.make_vacuum(parts)
+        for group in (mount, vacuum, assembly.make_top(parts, mount, vacuum)):
+            singles.append((f"solve/{group.name}", _cold_solve(group)))
+    for name, f in singles:
+        if wanted(name):
+            print(f"bench: {name}", file=sys.stderr)
+            results[name] = bench_function(f, repeats)
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "cadquery": cq.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+def print_results(data):
+    print(f"{'benchmark':45} {'median s':>10} {'min s':>10} {'peak MB':>9}")
+    for name, r in data["results"].items():
+        print(
+            f"{name:45} {r['median']:10.4f} {r['min']:10.4f} "
+            f"{r['peak_rss_mb']:9.1f}"
+        )
+
+
+def compare(data, baseline, threshold=0.1, min_delta=0.005):
+    """
+    Prints the change in median time of each benchmark against baseline,
+    flagging any that got slower by more than threshold (a fraction) and
+    min_delta seconds. Returns the names of the regressions.
+    """
+    regressions = []
+    print(f"{'benchmark':45} {'base s':>10} {'new s':>10} {'change':>8}")
+    for name, r in data["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:45} {'':>10} {r['median']:10.4f}      new")
+            continue
+        old, new = base["median"], r["median"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if new > old * (1 + threshold) and new - old > min_delta:
+            flag = "  <-- regression"
+            regressions.append(name)
+        print(f"{name:45} {old:10.4f} {new:10.4f} {change:+8.1%}{flag}")
+    for name in baseline["results"]:
+        if name not in data["results"]:
+            print(f"{name:45} not run")
+    if baseline.get("machine") != data["machine"]:
+        print("note: the baseline was recorded on a different machine or setup")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "patterns",
+        nargs="*",
+        help="only run benchmarks whose names contain one of these",
+    )
+    parser.add_argument(
+        "-n", "--repeats", type=int, default=3, help="runs per benchmark"
+    )
+    parser.add_argument("-o", "--out", help="write the results to this json file")
+    parser.add_argument(
+        "--compare", metavar="BASELINE", help="json results to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slow down that counts as a regression, as a fraction "
+        "(default 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    data = run(args.patterns, args.repeats)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(data, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(data, baseline, args.threshold):
+            return 1
+    else:
+        print_results(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Boolean operations with lots of tools at once.
+
+The parts used to do `for cutter in cutters: part = part.cut(cutter)`, which
+is one full boolean per cutter over an increasingly complicated solid. OCC can
+take every tool in one go and only has to intersect the part's faces once.
+
+Rows of identical cutters, like the magnet slots, can be made with pattern(),
+which places one cutter at lots of locations without copying its geometry.
+"""
+
+import cadquery as cq
+from OCP.BRepAlgoAPI import BRepAlgoAPI_Cut
+from OCP.TopTools import TopTools_ListOfShape
+
+
+def _solids(objs):
+    """
+    Flattens a list of cq.Workplanes and cq.Shapes into a list of cq.Shapes.
+    """
+    out = []
+    for obj in objs:
+        if isinstance(obj, cq.Workplane):
+            out.extend(o for o in obj.vals() if isinstance(o, cq.Shape))
+        else:
+            out.append(obj)
+    return out
+
+
+def cut_all(part, cutters, parallel=False, clean=True, tol=None):
+    """
+    Cuts every solid in cutters (cq.Workplanes or cq.Shapes) out of the solid
+    on part in a single boolean, with all of the cutters as tools. Returns a
+    cq.Workplane like part.cut would.
+
+    parallel turns on OCC's parallel mode for the boolean, tol sets the fuzzy
+    value like the tol argument of cq.Workplane.cut.
+    """
+    base = part.findSolid(searchStack=True, searchParents=True)
+    tools = _solids(cutters)
+    if not tools:
+        return part.newObject([base])
+    args_list = TopTools_ListOfShape()
+    args_list.Append(base.wrapped)
+    tools_list = TopTools_ListOfShape()
+    # the cutters can overlap each other, so they go in as separate tools
+    # rather than one compound, OCC sorts out the interference between them
+    for tool in tools:
+        tools_list.Append(tool.wrapped)
+    op = BRepAlgoAPI_Cut()
+    op.SetArguments(args_list)
+    op.SetTools(tools_list)
+    op.SetRunParallel(parallel)
+    if tol:
+        op.SetFuzzyValue(tol)
+    op.Build()
+    if not op.IsDone():
+        raise ValueError(f"cutting {len(tools)} tools from the part failed")
+    out = cq.Shape.cast(op.Shape())
+    if clean:
+        out = out.clean()
+    return part.newObject([out])
+
+
+def _location(loc):
+    if isinstance(loc, cq.Location):
+        return loc
+    if isinstance(loc, cq.Plane):
+        return cq.Location(loc)
+    return cq.Location(cq.Vector(loc))
+
+
+def pattern(tool, locations):
+    """
+    Places tool (a cq.Workplane or cq.Shape) at each of locations, which can
+    be cq.Locations, cq.Planes or points. Each copy is the same underlying
+    shape with a location on it, so tool's geometry is only made and stored
+    once however many copies there are. Returns a list of cq.Shapes.
+    """
+    shapes = _solids([tool])
+    return [s.moved(_location(loc)) for loc in locations for s in shapes]
+
+
+def cut_pattern(part, tool, locations, **kwargs):
+    """
+    Cuts tool out of part at every one of locations in a single boolean, see
+    pattern() and cut_all().
+    """
+    return cut_all(part, pattern(tool, locations), **kwargs)
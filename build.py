@@ -0,0 +1,346 @@
+"""
+Builds the parts for the assembly, reusing finished solids from the cache when
+nothing that went into them has changed.
+
+Each part has two cache entries. The manifest is keyed by the part's module
+source, its arguments and the CadQuery version, and lists the dims values the
+part read the last time it was built (see deps.py) along with the hashes of
+the local modules it used, like vac_helpers.py or booleans.py. The solid
+itself is keyed by the manifest key plus those values and hashes. So changing
+dims.brace.width only rebuilds brace.py, every other part finds its solid
+under the same key as before.
+"""
+
+import concurrent.futures
+import functools
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import types
+import cache
+import deps
+import dims
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# {module name: sha256 of the source it was loaded from} for the local
+# modules the parts use, see _reload_helpers
+_loaded = {}
+# local modules that are never reloaded, they hold state for the whole process
+# (or are this one)
+_not_reloaded = {"build", "cache", "deps", "instrument", "selection"}
+
+
+@functools.lru_cache(maxsize=None)
+def cadquery_version():
+    """
+    CadQuery's version, read from its package metadata so looking parts up in
+    the cache doesn't have to import it.
+    """
+    import importlib.metadata
+
+    try:
+        return importlib.metadata.version("cadquery")
+    except importlib.metadata.PackageNotFoundError:
+        import cadquery
+
+        return cadquery.__version__
+
+
+class Part:
+    """
+    A part in the assembly. Either a module level variable (when args is
+    None) or the result of calling a function in the module.
+    """
+
+    def __init__(self, module, attr, args=None, sources=()):
+        self.module = module
+        self.attr = attr
+        self.args = args
+        # files read while building this part, local modules it imports are
+        # found automatically after the first build
+        self.sources = (module + ".py",) + tuple(sources)
+
+    def source_bytes(self):
+        out = []
+        for name in self.sources:
+            with open(os.path.join(here, name), "rb") as f:
+                out.append(name.encode())
+                out.append(f.read())
+        return out
+
+    def key(self):
+        """
+        The key for this part's manifest.
+        """
+        return cache.key(
+            "manifest",
+            cadquery_version(),
+            repr(self.attr),
+            repr(self.args),
+            *self.source_bytes(),
+        )
+
+    def build(self):
+        """
+        Runs the part module and returns (the resulting cq.Workplane, the set
+        of dims paths it read, the local modules it used).
+        """
+        import selection
+
+        # memoised selectors and indexed NearestToPointSelector, they give
+        # the same results so they don't go in the key
+        with selection.memoised(), deps.record() as reads:
+            if self.module in sys.modules:
+                _reload_helpers(sys.modules[self.module])
+                module = importlib.reload(sys.modules[self.module])
+            else:
+                module = importlib.import_module(self.module)
+            out = getattr(module, self.attr)
+            if self.args is not None:
+                out = out(*self.args)
+        modules = local_modules(module) - {self.module}
+        for name, sha in source_hashes(modules - set(_loaded)).items():
+            _loaded[name[:-len(".py")]] = sha
+        return out, reads, modules
+
+
+parts = {
+    "back": Part("vslot", "cbeam_dxf", args=(250,), sources=("C-Beam-DXF.dxf",)),
+    "bracket": Part("bracket", "make", args=()),
+    "clamp": Part("clamp", "make", args=()),
+    "spindle": Part("spindle", "make", args=()),
+    "vac_brack": Part("vac_brack", "make", args=()),
+    "vac": Part("vac", "make", args=()),
+    "chimney": Part("chimney", "make", args=()),
+    "brace": Part("brace", "make", args=()),
+}
+
+
+def local_modules(module, found=None):
+    """
+    Returns the names of the modules from this directory that module uses,
+    directly or through other local modules. dims is left out since the
+    values read from it are tracked separately.
+    """
+    if found is None:
+        found = {module.__name__}
+    for value in vars(module).values():
+        if not isinstance(value, types.ModuleType):
+            # catches things brought in with "from x import y"
+            value = sys.modules.get(getattr(value, "__module__", None) or "")
+        if value is None or value.__name__ in found or value is dims:
+            continue
+        path = getattr(value, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(path)) == here:
+            found.add(value.__name__)
+            local_modules(value, found)
+    return found
+
+
+def _reload_helpers(module):
+    """
+    Reloads the local modules module uses whose source has changed since they
+    were loaded, or that were loaded without going through here. The solid's
+    key has the hash of the source on disk, so a part rebuilt in this process
+    has to run that code and not what was imported before the edit. Unchanged
+    modules are left alone, something might have patched them (see
+    instrument.py).
+    """
+    names = local_modules(module) - {module.__name__} - _not_reloaded
+    for name, sha in source_hashes(names).items():
+        name = name[:-len(".py")]
+        if _loaded.get(name) != sha:
+            importlib.reload(sys.modules[name])
+        _loaded[name] = sha
+
+
+def source_hashes(modules):
+    """
+    Returns {file name: sha256} for the named local modules.
+    """
+    out = {}
+    for name in sorted(modules):
+        with open(os.path.join(here, name + ".py"), "rb") as f:
+            out[name + ".py"] = hashlib.sha256(f.read()).hexdigest()
+    return out
+
+
+def dims_values(paths, module=None):
+    """
+    Returns {path: repr(value)} for the current dims, or module if given.
+    Paths that no longer exist map to None.
+    """
+    if module is None:
+        module = dims
+    out = {}
+    for path in sorted(paths):
+        try:
+            out[path] = repr(deps.resolve(module, path))
+        except AttributeError:
+            out[path] = None
+    return out
+
+
+def _solid_key(manifest_key, manifest):
+    return cache.key(manifest_key, json.dumps(manifest, sort_keys=True))
+
+
+def _current(manifest):
+    """
+    Returns what the manifest would be if the part was built right now.
+    """
+    return {
+        "dims": dims_values(manifest["dims"]),
+        "sources": source_hashes(
+            name[:-len(".py")] for name in manifest["sources"]
+        ),
+    }
+
+
+def _read_manifest(k):
+    hit = cache.read(k)
+    if hit is None:
+        return None
+    return json.loads(hit[0])
+
+
+def dependencies(name):
+    """
+    Returns the sorted list of dims paths the named part read the last time it
+    was built, or None if it hasn't been built with the current source.
+    """
+    manifest = _read_manifest(parts[name].key())
+    if manifest is None:
+        return None
+    return sorted(manifest["dims"])
+
+
+def _lookup(name):
+    """
+    Returns (the cached cq.Workplane or None, the manifest key, the reason the
+    part needs rebuilding).
+    """
+    manifest_key = parts[name].key()
+    manifest = _read_manifest(manifest_key)
+    if manifest is None:
+        return None, manifest_key, "source changed"
+    try:
+        current = _current(manifest)
+    except FileNotFoundError:
+        return None, manifest_key, "a local module changed"
+    out = cache.load_workplane(_solid_key(manifest_key, current))
+    if out is not None:
+        return out, manifest_key, None
+    changed = [
+        "dims." + path for path in manifest["dims"]
+        if manifest["dims"][path] != current["dims"][path]
+    ] + [
+        path for path in manifest["sources"]
+        if manifest["sources"][path] != current["sources"][path]
+    ]
+    if changed:
+        return None, manifest_key, ", ".join(changed) + " changed"
+    return None, manifest_key, "not in cache"
+
+
+def _rebuild(name, manifest_key, record=True):
+    """
+    Builds the named part and stores the solid. With record=False the part's
+    manifest and build time are left as they were, for builds with dims
+    values that aren't the ones in dims.py (see sweep.py).
+    """
+    spec = parts[name]
+    t0 = time.perf_counter()
+    out, reads, modules = spec.build()
+    elapsed = time.perf_counter() - t0
+    manifest = {"dims": dims_values(reads), "sources": source_hashes(modules)}
+    cache.store_workplane(_solid_key(manifest_key, manifest), out, part=name)
+    if not record:
+        return out
+    cache.write(manifest_key, json.dumps(manifest, indent=1).encode(), part=name)
+    # kept under the part's name rather than in the manifest so it survives
+    # source edits, it's only used to start the slow parts first
+    cache.write(_time_key(name), repr(elapsed).encode(), part=name)
+    return out
+
+
+def part(name):
+    """
+    Returns the cq.Workplane for the named part, from the cache if possible.
+    Uses dims as currently loaded, call importlib.reload(dims) first to pick
+    up edits.
+    """
+    out, manifest_key, reason = _lookup(name)
+    if out is not None:
+        return out
+    print(f"build: rebuilding {name}, {reason}")
+    return _rebuild(name, manifest_key)
+
+
+def _time_key(name):
+    return cache.key("build time", name)
+
+
+def _last_build_time(name):
+    """
+    How long the named part took to build last time. Parts that have never
+    been built count as slow.
+    """
+    hit = cache.read(_time_key(name))
+    if hit is None:
+        return float("inf")
+    return float(hit[0])
+
+
+def _worker(name, manifest_key):
+    """
+    Builds a part in a worker process. Shapes can't be pickled, so it goes back
+    to the parent as binary BREP plus the tag layout, see
+    cache.workplane_to_bytes.
+    """
+    return cache.workplane_to_bytes(_rebuild(name, manifest_key))
+
+
+def build(names=None, jobs=1):
+    """
+    Reloads dims and returns {name: cq.Workplane} for the named parts, or all
+    of them. With jobs > 1 the parts that aren't in the cache are built in
+    that many worker processes, the parts don't depend on each other so they
+    can all go at once.
+    """
+    importlib.reload(dims)
+    if names is None:
+        names = list(parts)
+    out = {}
+    todo = []
+    for name in names:
+        wp, manifest_key, reason = _lookup(name)
+        if wp is not None:
+            out[name] = wp
+        else:
+            print(f"build: rebuilding {name}, {reason}")
+            todo.append((name, manifest_key))
+    if jobs > 1 and len(todo) > 1:
+        # slowest first so the long builds aren't left until last
+        todo.sort(key=lambda item: _last_build_time(item[0]), reverse=True)
+        # spawn rather than fork, OCC doesn't like being forked
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(todo)), mp_context=context
+        ) as pool:
+            futures = {
+                name: pool.submit(_worker, name, manifest_key)
+                for name, manifest_key in todo
+            }
+            for name, future in futures.items():
+                out[name] = cache.workplane_from_bytes(*future.result())
+    else:
+        for name, manifest_key in todo:
+            out[name] = _rebuild(name, manifest_key)
+    return {name: out[name] for name in names}
@@ -0,0 +1,270 @@
+"""
+On disk cache for finished geometry.
+
+Entries are content addressed, the key is a hash of everything that went into
+building the shape (see build.py), so an entry never goes stale, it just stops
+being asked for and eventually gets evicted. Each entry is two files:
+<key>.bin holds the payload (binary BREP for shapes) and <key>.json holds the
+metadata, including a sha256 of the payload that is checked on every load.
+The metadata file is written last so a half written entry is never picked up.
+
+CadQuery is only imported by the functions that need it, it takes seconds and
+plenty of things only want the keys and metadata.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+max_bytes = 512 * 1024 ** 2
+# bump this if the layout of the payload or metadata changes
+FORMAT = 1
+
+
+def key(*items):
+    """
+    Hash a sequence of str or bytes into a cache key.
+    """
+    h = hashlib.sha256()
+    h.update(f"format {FORMAT}\n".encode())
+    for item in items:
+        if isinstance(item, str):
+            item = item.encode()
+        # length prefix so ("ab", "c") and ("a", "bc") don't collide
+        h.update(f"{len(item)}:".encode())
+        h.update(item)
+    return h.hexdigest()
+
+
+def _paths(k):
+    return (
+        os.path.join(directory, k + ".bin"),
+        os.path.join(directory, k + ".json"),
+    )
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def remove(k):
+    for path in _paths(k):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def read(k):
+    """
+    Returns (payload, metadata) for key k, or None on a miss. Entries that fail
+    the integrity check are deleted and treated as a miss.
+    """
+    data_path, meta_path = _paths(k)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            data = f.read()
+    except (FileNotFoundError, ValueError):
+        return None
+    if (
+        meta.get("format") != FORMAT
+        or meta.get("size") != len(data)
+        or meta.get("sha256") != hashlib.sha256(data).hexdigest()
+    ):
+        print(f"cache: discarding corrupt entry {k}")
+        remove(k)
+        return None
+    # the mtime of the payload is the LRU timestamp
+    try:
+        os.utime(data_path)
+    except FileNotFoundError:
+        pass
+    return data, meta
+
+
+def has(k):
+    """
+    True if there's an entry for key k, without reading or checking it.
+    """
+    return os.path.exists(_paths(k)[1])
+
+
+def write(k, data, **meta):
+    """
+    Store payload bytes under key k, along with any json-able metadata.
+    """
+    os.makedirs(directory, exist_ok=True)
+    data_path, meta_path = _paths(k)
+    meta.update(
+        format=FORMAT,
+        size=len(data),
+        sha256=hashlib.sha256(data).hexdigest(),
+    )
+    _write_atomic(data_path, data)
+    _write_atomic(meta_path, json.dumps(meta, indent=1).encode())
+    evict()
+
+
+def entries():
+    """
+    Returns a list of (last used time, size in bytes, key) for every entry.
+    """
+    out = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return out
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        k = name[:-len(".json")]
+        size = 0
+        used = 0.0
+        for path in _paths(k):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            size += stat.st_size
+            if path.endswith(".bin"):
+                used = stat.st_mtime
+        out.append((used, size, k))
+    return out
+
+
+def evict(limit=None):
+    """
+    Delete least recently used entries until the cache is under limit bytes.
+    """
+    if limit is None:
+        limit = max_bytes
+    current = entries()
+    total = sum(size for _, size, _ in current)
+    for _, size, k in sorted(current):
+        if total <= limit:
+            break
+        remove(k)
+        total -= size
+
+
+def _shape_bytes(shape):
+    buf = io.BytesIO()
+    shape.exportBin(buf)
+    return buf.getvalue()
+
+
+def _bytes_shape(data):
+    import cadquery as cq
+
+    return cq.Shape.importBin(io.BytesIO(data))
+
+
+def store_shape(k, shape, **meta):
+    write(k, _shape_bytes(shape), **meta)
+
+
+def load_shape(k):
+    """
+    Returns the cached cq.Shape for key k, or None.
+    """
+    hit = read(k)
+    if hit is None:
+        return None
+    shape = _bytes_shape(hit[0])
+    if shape.wrapped.IsNull():
+        remove(k)
+        return None
+    return shape
+
+
+def _plane_to_json(plane):
+    return {
+        "origin": plane.origin.toTuple(),
+        "xDir": plane.xDir.toTuple(),
+        "normal": plane.zDir.toTuple(),
+    }
+
+
+def workplane_to_bytes(wp):
+    """
+    Serialises the objects on a Workplane along with the objects and planes
+    of all its tags, so selections like wp.faces("<Z", tag="unslotted") still
+    work after loading. Only cq.Shape objects are kept. Returns (binary BREP,
+    layout), where layout is json-able.
+    """
+    import cadquery as cq
+
+    # everything goes into one flat compound, the layout records how many of
+    # its children belong to each group
+    groups = [("", wp)] + sorted(wp.ctx.tags.items())
+    shapes = []
+    layout = []
+    for name, tagged in groups:
+        objs = [o for o in tagged.objects if isinstance(o, cq.Shape)]
+        shapes.extend(objs)
+        layout.append({
+            "tag": name,
+            "count": len(objs),
+            "plane": _plane_to_json(tagged.plane),
+        })
+    return _shape_bytes(cq.Compound.makeCompound(shapes)), layout
+
+
+def workplane_from_bytes(data, layout):
+    """
+    Rebuilds a cq.Workplane, with its tags, from the output of
+    workplane_to_bytes. Returns None if the data doesn't match the layout.
+    """
+    import cadquery as cq
+
+    children = list(_bytes_shape(data))
+    if sum(group["count"] for group in layout) != len(children):
+        return None
+    groups = []
+    for group in layout:
+        objs = children[:group["count"]]
+        children = children[group["count"]:]
+        groups.append((group["tag"], cq.Plane(**group["plane"]), objs))
+    root = cq.Workplane()
+    for name, plane, objs in groups[1:]:
+        root.copyWorkplane(cq.Workplane(plane)).newObject(objs).tag(name)
+    _, plane, objs = groups[0]
+    return root.copyWorkplane(cq.Workplane(plane)).newObject(objs)
+
+
+def store_workplane(k, wp, **meta):
+    """
+    Store a cq.Workplane, see workplane_to_bytes.
+    """
+    data, layout = workplane_to_bytes(wp)
+    write(k, data, layout=layout, **meta)
+
+
+def load_workplane(k):
+    """
+    Returns a cq.Workplane rebuilt from the cache entry for key k, with its
+    tags restored, or None.
+    """
+    hit = read(k)
+    if hit is None:
+        return None
+    data, meta = hit
+    out = workplane_from_bytes(data, meta["layout"])
+    if out is None:
+        print(f"cache: discarding entry {k} with the wrong number of shapes")
+        remove(k)
+    return out
@@ -0,0 +1,252 @@
+"""
+Interference and clearance checks for the solved assembly.
+
+    python clearance.py                    # every pair of parts
+    python clearance.py vac spindle        # only pairs with these parts in
+    python clearance.py --margin 10 -j 4
+
+Every part in the assembly is moved to where the solve put it and each pair
+is checked. Most pairs are nowhere near each other, so first the bounding
+boxes are compared, all the pairs at once, and pairs whose boxes are further
+apart than margin are reported with the gap between the boxes as a lower
+bound on their distance. The rest get the exact minimum distance between the
+BReps and, if they touch, the volume of their intersection. Those exact
+checks run in worker processes.
+
+A pair is "interference" if the parts overlap by more than a tiny volume,
+"touching" if they meet without overlapping (parts bolted together) and
+"clear" otherwise.
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import sys
+import time
+import numpy as np
+import cadquery as cq
+import cache
+
+
+# anything closer than this counts as touching, in mm
+distance_tol = 1e-4
+# overlaps smaller than this are put down to the kernel, in mm^3
+volume_tol = 1e-3
+
+# the parts for the worker processes, {name: cq.Shape}
+_worker_shapes = {}
+
+
+def world_shapes(assy):
+    """
+    Returns {path: cq.Shape} for every part in assy, where path is like
+    "mount/spindle", with each shape moved to its place in the assembly.
+    """
+    out = {}
+
+    def walk(node, loc, prefix):
+        for child in node.children:
+            child_loc = loc * child.loc
+            obj = child.obj
+            if isinstance(obj, cq.Workplane):
+                shapes = [o for o in obj.vals() if isinstance(o, cq.Shape)]
+                obj = shapes[0] if len(shapes) == 1 else cq.Compound.makeCompound(
+                    shapes
+                )
+            if obj is not None:
+                out[prefix + child.name] = obj.moved(child_loc)
+            walk(child, child_loc, prefix + child.name + "/")
+
+    walk(assy, assy.loc, "")
+    return out
+
+
+def boxes(shapes):
+    """
+    The bounding boxes of shapes as an array of rows (xmin, ymin, zmin, xmax,
+    ymax, zmax).
+    """
+    out = []
+    for shape in shapes:
+        bb = shape.BoundingBox()
+        out.append((bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax))
+    return np.array(out, dtype=float).reshape(-1, 6)
+
+
+def box_gaps(bbs):
+    """
+    The distance between every pair of bounding boxes, 0 where they overlap,
+    as an n x n array.
+    """
+    lo, hi = bbs[:, :3], bbs[:, 3:]
+    # along each axis, how far box j starts after box i ends or the other way
+    # around, at most one of them is positive
+    gap = np.maximum(0, np.maximum(lo[None] - hi[:, None], lo[:, None] - hi[None]))
+    return np.sqrt((gap ** 2).sum(axis=2))
+
+
+def candidates(names, shapes, margin):
+    """
+    Splits the pairs of names into the ones whose bounding boxes are within
+    margin of each other, a list of (i, j), and the rest, {(i, j): gap}.
+    """
+    gaps = box_gaps(boxes(shapes))
+    near, far = [], {}
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            if gaps[i, j] <= margin:
+                near.append((i, j))
+            else:
+                far[(i, j)] = float(gaps[i, j])
+    return near, far
+
+
+def exact(a, b):
+    """
+    The minimum distance between shapes a and b and, if they touch, the
+    volume of their intersection.
+    """
+    distance = a.distance(b)
+    overlap = 0.0
+    if distance <= distance_tol:
+        overlap = a.intersect(b).Volume()
+    return distance, overlap
+
+
+def status(distance, overlap):
+    if overlap > volume_tol:
+        return "interference"
+    if distance <= distance_tol:
+        return "touching"
+    return "clear"
+
+
+def _init_worker(data):
+    global _worker_shapes
+    _worker_shapes = {name: cache._bytes_shape(d) for name, d in data.items()}
+
+
+def _check(a, b):
+    t0 = time.perf_counter()
+    distance, overlap = exact(_worker_shapes[a], _worker_shapes[b])
+    return distance, overlap, time.perf_counter() - t0
+
+
+def check(parts, margin=5.0, only=None, jobs=1):
+    """
+    Checks every pair of parts, {name: cq.Shape} (eg. from world_shapes), and
+    returns a list of result dicts, nearest pair first. With only, just the
+    pairs that include at least one of those names (or the end of one, so
+    "vac" matches "vacuum/vac").
+    """
+    names = list(parts)
+    near, far = candidates(names, [parts[n] for n in names], margin)
+
+    def wanted(i, j):
+        if not only:
+            return True
+        return any(
+            n == o or n.endswith("/" + o) for n in (names[i], names[j]) for o in only
+        )
+
+    near = [(i, j) for i, j in near if wanted(i, j)]
+    todo = [(names[i], names[j]) for i, j in near]
+    if jobs > 1 and len(todo) > 1:
+        used = {n for pair in todo for n in pair}
+        data = {n: cache._shape_bytes(parts[n]) for n in used}
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(todo)),
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(data,),
+        ) as pool:
+            results = list(pool.map(_check, *zip(*todo)))
+    else:
+        results = []
+        for a, b in todo:
+            t0 = time.perf_counter()
+            distance, overlap = exact(parts[a], parts[b])
+            results.append((distance, overlap, time.perf_counter() - t0))
+    out = []
+    for (a, b), (distance, overlap, seconds) in zip(todo, results):
+        out.append(
+            {
+                "a": a,
+                "b": b,
+                "status": status(distance, overlap),
+                "distance": distance,
+                "overlap": overlap,
+                "exact": True,
+                "time": seconds,
+            }
+        )
+    for (i, j), gap in far.items():
+        if wanted(i, j):
+            out.append(
+                {
+                    "a": names[i],
+                    "b": names[j],
+                    "status": "clear",
+                    "distance": gap,
+                    "overlap": 0.0,
+                    "exact": False,
+                    "time": 0.0,
+                }
+            )
+    return sorted(out, key=lambda r: (-r["overlap"], r["distance"]))
+
+
+def print_report(results):
+    print(
+        f"{'part':20} {'part':20} {'status':13} {'distance mm':>12} "
+        f"{'overlap mm3':>12} {'time s':>7}"
+    )
+    for r in results:
+        # pairs that were only checked with their bounding boxes are at least
+        # this far apart
+        distance = f"{'>=' if not r['exact'] else ''}{r['distance']:.3f}"
+        print(
+            f"{r['a']:20} {r['b']:20} {r['status']:13} {distance:>12} "
+            f"{r['overlap']:12.3f} {r['time']:7.3f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "parts", nargs="*", help="only check pairs with these parts in"
+    )
+    parser.add_argument(
+        "--margin",
+        type=float,
+        default=5.0,
+        help="pairs with bounding boxes further apart than this (mm) aren't "
+        "checked exactly (default 5)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="worker processes"
+    )
+    args = parser.parse_args(argv)
+
+    import assembly
+
+    assy = assembly.make(jobs=args.jobs)
+    t0 = time.perf_counter()
+    results = check(
+        world_shapes(assy),
+        args.margin,
+        args.parts,
+        args.jobs or multiprocessing.cpu_count(),
+    )
+    print_report(results)
+    exact_pairs = sum(r["exact"] for r in results)
+    print(
+        f"{len(results)} pairs, {exact_pairs} checked exactly, "
+        f"{time.perf_counter() - t0:.2f} s"
+    )
+    return 1 if any(r["status"] == "interference" for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
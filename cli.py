@@ -0,0 +1,166 @@
+"""
+Build the parts and the assembly without cq-editor and export them.
+
+    python cli.py                       # every part as STEP, plus the assembly
+    python cli.py brace chimney -f stl  # just those parts, as STL
+    python cli.py --no-assembly -f step -f brep -o print/
+
+Parts are written to <out>/<name>.<ext> and the assembly to
+<out>/assembly.step and <out>/assembly.xbf (see document.py). With
+--clearance the solved assembly is checked for interference too (see
+clearance.py). The time taken by each stage is printed at the end.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+formats = {"step": "STEP", "stl": "STL", "brep": "BREP"}
+
+
+class Timer:
+    """
+    Records how long each stage of the build takes.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def stage(self, name, seconds, part_of=None):
+        """
+        Stages that are part_of another one are printed under it and left
+        out of the total.
+        """
+        self.stages.append((name, seconds, part_of))
+
+    def time(self, name, f, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = f(*args, **kwargs)
+        self.stage(name, time.perf_counter() - t0)
+        return out
+
+    def print(self):
+        print("timings:")
+        for name, seconds, part_of in self.stages:
+            if part_of is not None:
+                name = "  " + name
+            print(f"    {name:30} {seconds:8.3f} s")
+        total = sum(seconds for _, seconds, part_of in self.stages if not part_of)
+        print(f"    {'total':30} {total:8.3f} s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build and export the spindle assembly parts."
+    )
+    parser.add_argument(
+        "parts",
+        nargs="*",
+        help="parts to build (default all of them)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        action="append",
+        choices=sorted(formats),
+        help="export format for the parts, can be given more than once "
+        "(default step)",
+    )
+    parser.add_argument(
+        "-o", "--out", default="out", help="output directory (default out)"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="worker processes for building parts (default number of CPUs)",
+    )
+    parser.add_argument(
+        "--no-assembly",
+        action="store_true",
+        help="skip solving and exporting the assembly",
+    )
+    parser.add_argument(
+        "--clearance",
+        action="store_true",
+        help="check the solved assembly for interference, see clearance.py",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="linear tolerance for STL meshes in mm (default 0.1)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timer = Timer()
+    status = 0
+    # cadquery takes a few seconds to import, which is worth knowing about
+    cq = timer.time("import cadquery", __import__, "cadquery")
+    import build
+
+    names = args.parts or list(build.parts)
+    unknown = [name for name in names if name not in build.parts]
+    if unknown:
+        print(
+            f"unknown parts: {', '.join(unknown)}, "
+            f"choose from {', '.join(build.parts)}"
+        )
+        return 2
+    exts = args.format or ["step"]
+    os.makedirs(args.out, exist_ok=True)
+
+    parts = timer.time("build parts", build.build, names, jobs=args.jobs)
+    t0 = time.perf_counter()
+    for name, wp in parts.items():
+        for ext in exts:
+            path = os.path.join(args.out, f"{name}.{ext}")
+            cq.exporters.export(wp, path, formats[ext], tolerance=args.tolerance)
+            print(f"wrote {path}")
+    timer.stage("export parts", time.perf_counter() - t0)
+
+    if not args.no_assembly:
+        import solve
+
+        import assembly
+
+        # the parts built above come straight out of the cache
+        assy = timer.time("assembly", assembly.make, jobs=args.jobs)
+        for group, stats in solve.stats.items():
+            timer.stage(
+                f"solve {group} ({stats['start']})", stats["time"], "assembly"
+            )
+        import document
+
+        for ext in ("step", "xbf"):
+            path = os.path.join(args.out, f"assembly.{ext}")
+            timer.time(
+                f"export assembly {ext}", document.save, assy, path
+            )
+            print(f"wrote {path}")
+
+        if args.clearance:
+            import clearance
+
+            results = timer.time(
+                "clearance",
+                clearance.check,
+                clearance.world_shapes(assy),
+                jobs=args.jobs,
+            )
+            clearance.print_report(results)
+            if any(r["status"] == "interference" for r in results):
+                status = 1
+
+    timer.print()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Records which values in dims.py get read while a part is being built.
+
+dims.py makes its tree out of Namespace instead of types.SimpleNamespace and
+swaps its module class for TrackedModule. While a record() block is active,
+every read of a value (not a namespace) is logged by its dotted path, eg.
+"chimney.mountface.width" or "bottom_of_vslot_to_bottom_of_bracket".
+
+memoise() uses the same records to keep a function's last result for as long
+as the values it read are unchanged, which is how the part modules' make()
+functions survive importlib.reload(dims) without going stale.
+"""
+
+import contextlib
+import functools
+import sys
+import types
+
+
+_recorders = []
+
+
+@contextlib.contextmanager
+def record():
+    """
+    Context manager that yields a set, filled with the dotted path of every
+    dims value read inside the block.
+    """
+    reads = set()
+    _recorders.append(reads)
+    try:
+        yield reads
+    finally:
+        _recorders.remove(reads)
+
+
+@contextlib.contextmanager
+def _paused():
+    """
+    Context manager that stops reads being recorded inside the block.
+    """
+    paused = _recorders[:]
+    _recorders.clear()
+    try:
+        yield
+    finally:
+        _recorders.extend(paused)
+
+
+def _values(module, paths):
+    """
+    Returns {path: repr(value)} for paths in module, None where a path no
+    longer exists.
+    """
+    out = {}
+    with _paused():
+        for path in paths:
+            try:
+                out[path] = repr(resolve(module, path))
+            except AttributeError:
+                out[path] = None
+    return out
+
+
+def memoise(module):
+    """
+    Decorator that keeps the last result of a function of the values in
+    module (eg. dims) and returns it again while the arguments are the same
+    and every value it read last time has the same repr. Only the last
+    result is kept. A call that reuses it still counts as reading those
+    values for any active recorders.
+    """
+
+    def decorator(f):
+        last = None
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            nonlocal last
+            if last is not None:
+                last_args, values, out = last
+                if last_args == (args, kwargs) and _values(module, values) == values:
+                    for reads in _recorders:
+                        reads.update(values)
+                    return out
+            with record() as reads:
+                out = f(*args, **kwargs)
+            last = ((args, kwargs), _values(module, reads), out)
+            return out
+
+        def cache_clear():
+            nonlocal last
+            last = None
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+def _read(value, path):
+    if isinstance(value, Namespace):
+        # namespaces find out where they live the first time they're read
+        object.__setattr__(value, "_path", path)
+    elif not isinstance(value, (types.ModuleType, type)):
+        for reads in _recorders:
+            reads.add(path)
+    return value
+
+
+class Namespace(types.SimpleNamespace):
+    """
+    types.SimpleNamespace that reports reads to any active recorders.
+    """
+
+    # a slot, so the path doesn't show up in vars() or repr()
+    __slots__ = ("_path",)
+
+    def __getattribute__(self, name):
+        value = super().__getattribute__(name)
+        if _recorders and not name.startswith("_"):
+            try:
+                prefix = object.__getattribute__(self, "_path") + "."
+            except AttributeError:
+                # created but never reached from the module, eg. a temporary
+                prefix = "?."
+            value = _read(value, prefix + name)
+        return value
+
+
+class TrackedModule(types.ModuleType):
+    """
+    Module class that reports reads of module level values.
+    """
+
+    def __getattribute__(self, name):
+        value = super().__getattribute__(name)
+        if _recorders and not name.startswith("_"):
+            value = _read(value, name)
+        return value
+
+
+def track(module_name):
+    """
+    Start tracking reads of module level values in the named module. Call
+    with __name__ from the module itself.
+    """
+    sys.modules[module_name].__class__ = TrackedModule
+
+
+def resolve(module, path):
+    """
+    Returns the value at a dotted path like "magnet.slot.width". Raises
+    AttributeError if it doesn't exist. Don't call this inside record().
+    """
+    return functools.reduce(getattr, path.split("."), module)
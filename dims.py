@@ -1,5 +1,8 @@
 import math
-from types import SimpleNamespace as d
+import deps
+from deps import Namespace as d
+
+deps.track(__name__)
 
 
 clamp = d()
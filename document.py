@@ -0,0 +1,108 @@
+"""
+The solved assembly saved as one document, so it can be looked at without
+building any parts or running the solver.
+
+    python document.py                     # list what's in out/assembly.xbf
+    python document.py out/assembly.step
+
+assembly.py saves the assembly once it's placed in cq-editor (or when
+assembly.make() is given out) and cli.py saves it next to the exported
+parts. The document holds the
+names, colours and locations from assembly.py along with the solids, and a
+part that's used more than once is only stored once. Two formats are
+written: .xbf is OCC's own binary XCAF document, which loads in a few
+hundredths of a second, and .step is the same thing for other CAD programs.
+Open this file in cq-editor to show the last saved assembly.
+"""
+
+import argparse
+import os
+import sys
+import time
+import cadquery as cq
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+default_path = os.path.join(here, "out", "assembly.xbf")
+
+# file extension: format for cq.Assembly.export and cq.Assembly.load
+formats = {".xbf": "XBF", ".step": "STEP", ".stp": "STEP", ".xml": "XML"}
+
+
+def _format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in formats:
+        raise ValueError(
+            f"can't tell the format of {path}, use one of {', '.join(formats)}"
+        )
+    return formats[ext]
+
+
+def save(assy, path=default_path):
+    """
+    Writes assy to path, in the format that goes with its extension.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    assy.export(path, _format(path))
+    return path
+
+
+def load(path=default_path):
+    """
+    Reads an assembly saved by save() back into a cq.Assembly.
+    """
+    return cq.Assembly.load(path, _format(path))
+
+
+def parts(assy):
+    """
+    Returns a list of (path, cq.Color or None, cq.Location in world
+    coordinates, cq.Shape or None) for every node in assy, depth first.
+    """
+    out = []
+
+    def walk(node, loc, prefix):
+        for child in node.children:
+            child_loc = loc * child.loc
+            shape = None
+            if child.obj is not None:
+                shape = child.toCompound().located(child_loc)
+            out.append((prefix + child.name, child.color, child_loc, shape))
+            walk(child, child_loc, prefix + child.name + "/")
+
+    walk(assy, assy.loc, "")
+    return out
+
+
+def print_parts(assy):
+    print(f"{'part':20} {'colour (rgba)':22} {'position':28} {'volume':>12}")
+    for name, color, loc, shape in parts(assy):
+        rgba = ""
+        if color is not None:
+            rgba = " ".join(f"{v:.2f}" for v in color.toTuple())
+        position = " ".join(f"{v:8.3f}" for v in loc.toTuple()[0])
+        volume = f"{shape.Volume():12.1f}" if shape is not None else ""
+        print(f"{name:20} {rgba:22} {position:28} {volume:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default=default_path,
+        help=f"saved assembly (default {os.path.relpath(default_path)})",
+    )
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    assy = load(args.path)
+    print(f"loaded {args.path} in {time.perf_counter() - t0:.3f} s")
+    print_parts(assy)
+    return 0
+
+
+if "show_object" in globals():
+    show_object(load())
+elif __name__ == "__main__":
+    sys.exit(main())
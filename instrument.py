@@ -0,0 +1,285 @@
+"""
+Opt in profiling of the CadQuery calls made while building parts.
+
+    python instrument.py                      # every part, table of the slowest calls
+    python instrument.py chimney --top 40
+    python instrument.py --trace trace.json   # open in chrome://tracing or Perfetto
+
+While a Profiler is active every public cq.Workplane method and the Shape
+booleans (cut, fuse, intersect, split, on Shape and Compound) and
+booleans.cut_all are wrapped to record the wall time,
+the part being built and the line in this repo that made the call, going by
+the part file rather than helpers like booleans.py or magnets.py. Nested
+calls (eg. cutBlind calling Shape.cut) are recorded too, the table shows
+both the total time and the self time, which leaves out the time spent in
+nested recorded calls, and the trace shows the nesting. Nothing is wrapped
+unless a Profiler is active.
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+import cadquery as cq
+import booleans
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+shape_booleans = ["cut", "fuse", "intersect", "split"]
+# modules in this repo that the parts call into, calls made inside them are
+# put down to the line in the part that called them
+helpers = [
+    "booleans.py",
+    "cache.py",
+    "deps.py",
+    "instrument.py",
+    "magnets.py",
+    "selection.py",
+    "vac_helpers.py",
+]
+
+
+def workplane_methods():
+    """
+    Names of the public methods of cq.Workplane.
+    """
+    return sorted(
+        name
+        for name, value in vars(cq.Workplane).items()
+        if not name.startswith("_")
+        and callable(value)
+        and not isinstance(value, (type, classmethod, staticmethod))
+    )
+
+
+@contextlib.contextmanager
+def patched(targets, wrap):
+    """
+    Replaces each (owner, attr) in targets with wrap(original function, name),
+    where name is like "Workplane.sweep", and puts them back afterwards.
+    Handles classmethods and staticmethods.
+    """
+    originals = []
+    try:
+        for owner, attr in targets:
+            original = vars(owner)[attr]
+            name = f"{owner.__name__}.{attr}"
+            if isinstance(original, (classmethod, staticmethod)):
+                new = type(original)(wrap(original.__func__, name))
+            else:
+                new = wrap(original, name)
+            originals.append((owner, attr, original))
+            setattr(owner, attr, new)
+        yield
+    finally:
+        for owner, attr, original in reversed(originals):
+            setattr(owner, attr, original)
+
+
+def _caller():
+    """
+    The file:line in this repo that the current call came from, skipping
+    cadquery itself and the helper modules.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if os.path.dirname(path) == here and os.path.basename(path) not in helpers:
+            return f"{os.path.basename(path)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+class Profiler:
+    """
+    Context manager that records the CadQuery calls made while it's active.
+    Set .part to label the calls with the part being built.
+    """
+
+    def __init__(self):
+        self.part = None
+        self.events = []
+        self._stack = []
+        self._t0 = None
+
+    def targets(self):
+        out = [(cq.Workplane, name) for name in workplane_methods()]
+        # Compound has its own versions of some of the booleans
+        for cls in (cq.Shape, cq.Compound):
+            out.extend((cls, name) for name in shape_booleans if name in vars(cls))
+        out.append((booleans, "cut_all"))
+        return out
+
+    def _wrap(self, f, name):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            line = _caller()
+            event = {
+                "name": name,
+                "part": self.part,
+                "line": line,
+                "depth": len(self._stack),
+                "child": 0.0,
+                # a recursive call to the same method from the same line,
+                # its time is already in the outer call's total
+                "inner": any(
+                    p["name"] == name and p["line"] == line for p in self._stack
+                ),
+            }
+            self._stack.append(event)
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                self._stack.pop()
+                event["start"] = start - self._t0
+                event["time"] = end - start
+                if self._stack:
+                    self._stack[-1]["child"] += event["time"]
+                self.events.append(event)
+
+        return wrapper
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        self._patch = patched(self.targets(), self._wrap)
+        self._patch.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._patch.__exit__(*exc)
+
+    def table(self):
+        """
+        Returns a list of dicts, one per (part, method, line) with the call
+        count, total and self time, slowest total first.
+        """
+        rows = {}
+        for e in self.events:
+            k = (e["part"], e["name"], e["line"])
+            row = rows.setdefault(
+                k,
+                {
+                    "part": e["part"],
+                    "name": e["name"],
+                    "line": e["line"],
+                    "calls": 0,
+                    "total": 0.0,
+                    "self": 0.0,
+                },
+            )
+            row["calls"] += 1
+            if not e["inner"]:
+                row["total"] += e["time"]
+            row["self"] += e["time"] - e["child"]
+        return sorted(rows.values(), key=lambda r: r["total"], reverse=True)
+
+    def print_table(self, top=None, sort="total"):
+        rows = sorted(self.table(), key=lambda r: r[sort], reverse=True)
+        if top:
+            rows = rows[:top]
+        print(
+            f"{'part':10} {'call':24} {'line':18} "
+            f"{'calls':>6} {'total s':>9} {'self s':>9}"
+        )
+        for r in rows:
+            print(
+                f"{r['part'] or '':10} {r['name']:24} {r['line']:18} "
+                f"{r['calls']:6} {r['total']:9.4f} {r['self']:9.4f}"
+            )
+
+    def trace(self):
+        """
+        The events in Chrome's trace event format, one thread per part.
+        """
+        parts = []
+        for e in self.events:
+            if e["part"] not in parts:
+                parts.append(e["part"])
+        out = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": i,
+                "args": {"name": part or "other"},
+            }
+            for i, part in enumerate(parts)
+        ]
+        for e in sorted(self.events, key=lambda e: (e["start"], e["depth"])):
+            out.append(
+                {
+                    "name": e["name"],
+                    "cat": e["part"] or "other",
+                    "ph": "X",
+                    "pid": 1,
+                    "tid": parts.index(e["part"]),
+                    "ts": e["start"] * 1e6,
+                    "dur": e["time"] * 1e6,
+                    "args": {"line": e["line"]},
+                }
+            )
+        return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+
+
+def profile_parts(names=None):
+    """
+    Builds the named parts (or all of them) from scratch under a Profiler and
+    returns it.
+    """
+    import build
+    import dims
+    import importlib
+
+    importlib.reload(dims)
+    if names is None:
+        names = list(build.parts)
+    with Profiler() as profiler:
+        for name in names:
+            profiler.part = name
+            build.parts[name].build()
+    return profiler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("parts", nargs="*", help="parts to profile (default all)")
+    parser.add_argument("--top", type=int, default=30, help="rows in the table")
+    parser.add_argument(
+        "--sort",
+        choices=["total", "self", "calls"],
+        default="total",
+        help="column to sort the table by",
+    )
+    parser.add_argument("--trace", help="write a Chrome trace to this file")
+    parser.add_argument("--csv", help="write the whole table to this csv file")
+    args = parser.parse_args(argv)
+
+    profiler = profile_parts(args.parts or None)
+    profiler.print_table(args.top, args.sort)
+    if args.trace:
+        profiler.write_trace(args.trace)
+        print(f"wrote {args.trace}")
+    if args.csv:
+        import csv
+
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(
+                f, ["part", "name", "line", "calls", "total", "self"]
+            )
+            writer.writeheader()
+            writer.writerows(profiler.table())
+        print(f"wrote {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+The magnet slot cutters, shared by each pair of parts that the magnets hold
+together: vac and vac_brack, chimney and brace.
+
+Each cutter is made once for a given size, at the origin, and the parts place
+it at their magnet positions with booleans.pattern(). The sizes are passed in
+rather than read from dims here, so the reads are recorded against the part
+being built (see deps.py) and a change to dims gives a new cutter. Edits to
+this file are picked up by build.py, which reloads it (emptying the caches)
+when its source changes.
+"""
+
+import functools
+import cadquery as cq
+
+
+@functools.lru_cache(maxsize=None)
+def slot(width, thick, depth):
+    """
+    A slot with a round bottom that a magnet is pushed into from the side.
+    The opening is on the XY plane, centred on the origin, width along X and
+    thick along Y, and the slot goes depth down -Z to the centre of the half
+    cylinder that makes the bottom.
+    """
+    box = cq.Solid.makeBox(
+        width, thick, depth, pnt=cq.Vector(-width / 2, -thick / 2, -depth)
+    )
+    bottom = cq.Solid.makeCylinder(
+        width / 2,
+        thick,
+        pnt=cq.Vector(0, -thick / 2, -depth),
+        dir=cq.Vector(0, 1, 0),
+    )
+    return box.fuse(bottom).clean()
+
+
+@functools.lru_cache(maxsize=None)
+def mountface_slot(width, diam, thick):
+    """
+    The slots in the chimney's mounting face and the brace, open along +Z
+    with a round end at the origin, thick deep along -Y.
+    """
+    return (
+        cq
+        .Workplane('XZ', origin=(0, 0, 0))
+        .moveTo(width / 2, diam)
+        .vLineTo(0)
+        .tangentArcPoint((-width / 2, 0), relative=False)
+        .vLineTo(diam)
+        .close()
+        .extrude(thick)
+        .val()
+    )
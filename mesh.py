@@ -0,0 +1,264 @@
+"""
+Cached triangulations for displaying the parts.
+
+cq-editor meshes every solid each time the script is run, and the back and
+vac parts are slow to mesh. Here each shape is meshed at three levels of
+detail and stored in the cache (see cache.py) as binary BREP with the
+triangulation included, keyed by a hash of the shape's geometry. prepare()
+puts the finest cached mesh onto each part of an assembly before it's shown,
+meshing the coarse level on the spot if there's nothing cached, and starts a
+background process meshing the finer levels for next time. Changing one part
+only changes its hash, the others keep their meshes.
+
+The display only skips meshing if the mesh it's given is at least as fine as
+the one it wants, which like the levels here is a deviation coefficient
+relative to the size of each shape (cq-editor's "Deviation" preference).
+Levels coarser than viewer_deviation would just be meshed again, so only the
+ones at least as fine are attached. With cq-editor's default that's the
+fine level, set its Deviation preference and viewer_deviation to 1e-3 to
+see the coarse mesh first.
+"""
+
+import hashlib
+import io
+import multiprocessing
+import cadquery as cq
+from OCP.Aspect import Aspect_TOD_RELATIVE
+from OCP.BinTools import BinTools, BinTools_FormatVersion
+from OCP.BRep import BRep_Builder, BRep_Tool
+from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.Prs3d import Prs3d_Drawer
+from OCP.StdPrs import StdPrs_ToolTriangulatedShape
+from OCP.TopAbs import TopAbs_EDGE, TopAbs_FACE, TopAbs_FORWARD, TopAbs_REVERSED
+from OCP.TopExp import TopExp, TopExp_Explorer
+from OCP.TopLoc import TopLoc_Location
+from OCP.TopoDS import TopoDS
+from OCP.TopTools import TopTools_IndexedMapOfShape
+import cache
+
+
+# cq-editor's "Deviation" and "Angular deviation" preferences, keep them in
+# step if they're changed there
+viewer_deviation = 1e-5
+viewer_angle = 0.1
+
+# name: (deviation coefficient, angular deflection in radians), coarsest
+# first
+levels = {
+    "coarse": (1e-3, 0.5),
+    "medium": (1e-4, 0.2),
+    "fine": (viewer_deviation, viewer_angle),
+}
+
+# the background process meshing the finer levels, if one is running
+_refiner = None
+
+
+def geometry_bytes(shape):
+    """
+    Binary BREP of shape without any triangulation it might have.
+    """
+    buf = io.BytesIO()
+    BinTools.Write_s(
+        shape.wrapped,
+        buf,
+        False,
+        False,
+        BinTools_FormatVersion.BinTools_FormatVersion_CURRENT,
+    )
+    return buf.getvalue()
+
+
+def geometry_hash(shape):
+    return hashlib.sha256(geometry_bytes(shape)).hexdigest()
+
+
+def deflection(shape, coefficient):
+    """
+    The linear deflection in mm that a viewer with this deviation coefficient
+    meshes shape with, worked out the same way the viewer does.
+    """
+    drawer = Prs3d_Drawer()
+    drawer.SetTypeOfDeflection(Aspect_TOD_RELATIVE)
+    drawer.SetDeviationCoefficient(coefficient)
+    return StdPrs_ToolTriangulatedShape.GetDeflection_s(shape.wrapped, drawer)
+
+
+def shown_levels():
+    """
+    The levels the viewer will use as they are, coarsest first.
+    """
+    return [level for level in levels if levels[level][0] <= viewer_deviation]
+
+
+def _key(digest, level):
+    return cache.key("display mesh", level, repr(levels[level]), digest)
+
+
+def cached_levels(digest):
+    """
+    The levels that are in the cache for the shape with this hash.
+    """
+    return [level for level in levels if cache.has(_key(digest, level))]
+
+
+def _mesh_bytes(data, digest, level):
+    """
+    Meshes the shape in data (from geometry_bytes) at level, stores it and
+    returns the meshed cq.Shape.
+    """
+    shape = cache._bytes_shape(data)
+    coefficient, angular = levels[level]
+    linear = deflection(shape, coefficient)
+    BRepMesh_IncrementalMesh(shape.wrapped, linear, False, angular, True)
+    for face in _faces(shape):
+        triangulation = BRep_Tool.Triangulation_s(face, TopLoc_Location())
+        # some faces, like the chimney's swept B-splines, never get within the
+        # deflection however fine they're meshed. The viewer would mesh them
+        # again on every refresh and get the same triangles, so they're
+        # marked as being as good as this level gets.
+        if triangulation is not None and triangulation.Deflection() > linear:
+            triangulation.Deflection(linear)
+    cache.store_shape(_key(digest, level), shape, level=level)
+    return shape
+
+
+def mesh(shape, level, digest=None):
+    """
+    Returns a copy of shape meshed at level, from the cache if possible.
+    """
+    if digest is None:
+        digest = geometry_hash(shape)
+    out = cache.load_shape(_key(digest, level))
+    if out is None:
+        out = _mesh_bytes(geometry_bytes(shape), digest, level)
+    return out
+
+
+def _faces(shape):
+    faces = TopTools_IndexedMapOfShape()
+    TopExp.MapShapes_s(shape.wrapped, TopAbs_FACE, faces)
+    return [
+        TopoDS.Face_s(faces.FindKey(i)) for i in range(1, faces.Extent() + 1)
+    ]
+
+
+def _edges(face):
+    out = []
+    explorer = TopExp_Explorer(face, TopAbs_EDGE)
+    while explorer.More():
+        out.append(TopoDS.Edge_s(explorer.Current()))
+        explorer.Next()
+    return out
+
+
+def _copy_edges(builder, source, target, triangulation, loc):
+    """
+    Copies the polygons on triangulation of the edges of face source onto
+    the same edges of face target. The viewer only takes a mesh as it is if
+    the edges have them as well as the faces.
+    """
+    # the same placement, but locations only compare equal if they're made
+    # of the same objects, and target's weren't read from the same file
+    target_loc = target.Location()
+    for s, t in zip(_edges(source), _edges(target)):
+        if BRep_Tool.IsClosed_s(s, source):
+            # a seam has a polygon for each side
+            forward, reversed_ = (
+                BRep_Tool.PolygonOnTriangulation_s(
+                    TopoDS.Edge_s(s.Oriented(o)), triangulation, loc
+                )
+                for o in (TopAbs_FORWARD, TopAbs_REVERSED)
+            )
+            if forward is not None and reversed_ is not None:
+                builder.UpdateEdge(
+                    t, forward, reversed_, triangulation, target_loc
+                )
+            continue
+        polygon = BRep_Tool.PolygonOnTriangulation_s(s, triangulation, loc)
+        if polygon is not None:
+            builder.UpdateEdge(t, polygon, triangulation, target_loc)
+
+
+def transfer(source, target):
+    """
+    Copies the triangulation of every face of source, and the polygons of
+    their edges, onto the same faces of target. They must have the same
+    geometry, eg. target was read back from the BREP of source.
+    """
+    builder = BRep_Builder()
+    source_faces = _faces(source)
+    target_faces = _faces(target)
+    if len(source_faces) != len(target_faces):
+        raise ValueError("shapes have different faces, can't copy the mesh")
+    for s, t in zip(source_faces, target_faces):
+        loc = TopLoc_Location()
+        triangulation = BRep_Tool.Triangulation_s(s, loc)
+        if triangulation is not None:
+            builder.UpdateFace(t, triangulation)
+            _copy_edges(builder, s, t, triangulation, loc)
+
+
+def attach(shape):
+    """
+    Puts the finest cached mesh the viewer will use onto shape, meshing the
+    coarsest of those if none are cached. Returns (the level used, the
+    shape's hash).
+    """
+    digest = geometry_hash(shape)
+    shown = shown_levels() or list(levels)[-1:]
+    cached = [level for level in cached_levels(digest) if level in shown]
+    level = cached[-1] if cached else shown[0]
+    transfer(mesh(shape, level, digest), shape)
+    return level, digest
+
+
+def _refine(todo):
+    """
+    Meshes the levels in todo, a list of (geometry bytes, hash, level).
+    Runs in its own process.
+    """
+    for data, digest, level in todo:
+        if not cache.has(_key(digest, level)):
+            _mesh_bytes(data, digest, level)
+
+
+def refine_in_background(todo):
+    """
+    Starts a process meshing todo, unless the last one is still running.
+    """
+    global _refiner
+    if not todo or (_refiner is not None and _refiner.is_alive()):
+        return
+    context = multiprocessing.get_context("spawn")
+    _refiner = context.Process(target=_refine, args=(todo,), daemon=True)
+    _refiner.start()
+
+
+def _shapes(assy):
+    for _, child in assy.traverse():
+        obj = child.obj
+        if isinstance(obj, cq.Workplane):
+            yield from (o for o in obj.vals() if isinstance(o, cq.Shape))
+        elif isinstance(obj, cq.Shape):
+            yield obj
+
+
+def prepare(assy, background=True):
+    """
+    Attaches cached meshes to every part in assy and, with background=True,
+    starts meshing the finer levels that aren't cached yet. Returns {level:
+    number of shapes} for the meshes used.
+    """
+    used = {}
+    todo = []
+    for shape in _shapes(assy):
+        level, digest = attach(shape)
+        used[level] = used.get(level, 0) + 1
+        finer = list(levels)[list(levels).index(level) + 1:]
+        if finer:
+            data = geometry_bytes(shape)
+            todo.extend((data, digest, name) for name in finer)
+    if background:
+        refine_in_background(todo)
+    return used
@@ -0,0 +1,45 @@
+"""
+Closed form locations for the parts that have them.
+
+dims.assembly holds the offsets of the bracket, clamp, spindle, vac_brack and
+vac, worked out by hand from the dimensions. Using them directly is instant
+and exact, so the solver is only needed for the chimney and brace. Use
+solve.report to check the result against the constraints in assembly.py.
+"""
+
+import cadquery as cq
+import dims
+
+
+def locations():
+    """
+    Returns {name: cq.Location} in world coordinates for every part with a
+    closed form location. The clamp is the one rotated by 180 degrees in
+    assembly.py.
+    """
+    return {
+        "back": cq.Location(),
+        "bracket": cq.Location(cq.Vector(*dims.assembly.bracket.offset)),
+        "clamp": cq.Location(cq.Vector(*dims.assembly.clamp.offset)),
+        "spindle": cq.Location(cq.Vector(*dims.assembly.spindle.offset)),
+        "vac_brack": cq.Location(cq.Vector(*dims.assembly.vac_brack.offset)),
+        "vac": cq.Location(cq.Vector(*dims.assembly.vac.offset)),
+    }
+
+
+def relative(frame, name):
+    """
+    The location of part name relative to part frame.
+    """
+    locs = locations()
+    return locs[frame].inverse * locs[name]
+
+
+def place(assy, frame, names):
+    """
+    Sets the location of each of names in assy relative to frame, which is
+    the part assy's own coordinates are taken from.
+    """
+    for name in names:
+        assy.objects[name].loc = relative(frame, name)
+    return assy
@@ -0,0 +1,179 @@
+"""
+Memoised selectors.
+
+assembly.py runs the same selectors on the same shapes over and over, eg.
+back.faces("<Z", tag="unslotted") four times, and "bracket@faces@<Z" style
+constraints end up doing the same thing. Every one of those parses the
+selector string again and goes through every face again. Inside a
+memoised() block string selectors are parsed once and the result of each
+selection is kept,
+keyed by the identity of the shapes it was made from (TShape, location and
+orientation) and the selector string. Shapes never change once made, so a
+result can't go stale. Other selector objects aren't cached, they'd need
+comparing by value. When the block ends cq.Workplane is put back the way it
+was and the kept results are dropped, so nothing outside it (cq-editor, a
+later build) sees them.
+
+NearestToPointSelector gets an index instead. clamp.py asks for the edge
+nearest a point six times on the same edges, and each of those works out the
+centre of every edge again. Here the centres of a set of candidates are
+worked out once and reused by every query on the same shapes, each query is
+a numpy search over the centres. scipy's KD-tree is only worth it for a lot
+of queries on a lot of shapes: importing scipy takes about half a second,
+and under a thousand or so centres numpy is quicker per query anyway. So an
+index only builds one (if scipy is installed) once it has answered more
+than tree_after queries on at least tree_min shapes. None of the parts get
+anywhere near that, clamp.py's six queries never import scipy.
+"""
+
+import collections
+import contextlib
+import numpy as np
+import cadquery as cq
+from cadquery import selectors
+
+
+# how many selections to keep, the oldest go first
+max_results = 1024
+# how many queries a NearestIndex answers before it builds a KD-tree, and
+# how many shapes it needs
+tree_after = 2000
+tree_min = 1000
+
+_parsed = {}
+_results = collections.OrderedDict()
+_indexes = collections.OrderedDict()
+_original = None
+_depth = 0
+stats = {"hits": 0, "misses": 0, "indexes": 0, "nearest": 0}
+
+
+def parse(selector):
+    """
+    The Selector for a selector string, parsing each string only once.
+    """
+    out = _parsed.get(selector)
+    if out is None:
+        out = _parsed[selector] = selectors.StringSyntaxSelector(selector)
+    return out
+
+
+class NearestIndex:
+    """
+    Answers NearestToPointSelector queries on a fixed list of shapes.
+    """
+
+    def __init__(self, objs):
+        self.objs = list(objs)
+        self.centres = np.array([o.Center().toTuple() for o in self.objs])
+        self.tree = None
+        self.queries = 0
+
+    def _build_tree(self):
+        try:
+            # imported here, scipy adds a noticeable amount to startup
+            from scipy.spatial import cKDTree
+        except ImportError:
+            return
+        self.tree = cKDTree(self.centres)
+
+    def _distances(self, idxs, p):
+        return np.sqrt(((self.centres[idxs] - p) ** 2).sum(axis=1))
+
+    def nearest(self, pnt):
+        """
+        The shape with its centre nearest pnt. Like NearestToPointSelector,
+        the first one wins a tie.
+        """
+        p = np.asarray(tuple(pnt), dtype=float)
+        self.queries += 1
+        # only tried once, without scipy it stays a numpy search
+        if self.queries == tree_after + 1 and len(self.objs) >= tree_min:
+            self._build_tree()
+        if self.tree is None:
+            return self.objs[int(np.argmin(self._distances(slice(None), p)))]
+        d, _ = self.tree.query(p)
+        # everything about as near as the nearest, to break ties the same
+        # way min() does
+        near = self.tree.query_ball_point(p, d * (1 + 1e-9) + 1e-12)
+        idxs = np.array(sorted(near))
+        return self.objs[int(idxs[np.argmin(self._distances(idxs, p))])]
+
+
+def _remember(cache, key, objs, value):
+    cache[key] = (tuple(objs), value)
+    while len(cache) > max_results:
+        cache.popitem(last=False)
+
+
+def _recall(cache, key, objs):
+    hit = cache.get(key)
+    # the hash code could collide, so check the shapes really are the same,
+    # the entry keeps them alive so their TShapes can't be reused
+    if hit is None or len(hit[0]) != len(objs):
+        return None
+    if not all(a.wrapped.IsEqual(b.wrapped) for a, b in zip(hit[0], objs)):
+        return None
+    cache.move_to_end(key)
+    return hit[1]
+
+
+def _select_objects(self, objType, selector=None, tag=None):
+    # an exact type check, a subclass could have changed filter
+    nearest = type(selector) is selectors.NearestToPointSelector
+    if selector is not None and not isinstance(selector, str) and not nearest:
+        return _original(self, objType, selector, tag)
+    cq_obj = self._getTagged(tag) if tag else self
+    objs = cq_obj.objects
+    if not all(isinstance(o, cq.Shape) for o in objs):
+        return _original(self, objType, selector, tag)
+    ids = tuple(o.hashCode() for o in objs)
+    if nearest:
+        key = (objType, ids)
+        index = _recall(_indexes, key, objs)
+        if index is None:
+            found = cq_obj._collectProperty(objType)
+            if not found:
+                return _original(self, objType, selector, tag)
+            index = NearestIndex(found)
+            _remember(_indexes, key, objs, index)
+            stats["indexes"] += 1
+        stats["nearest"] += 1
+        return self.newObject([index.nearest(selector.pnt)])
+    key = (objType, selector, ids)
+    found = _recall(_results, key, objs)
+    if found is not None:
+        stats["hits"] += 1
+        return self.newObject(list(found))
+    stats["misses"] += 1
+    found = cq_obj._collectProperty(objType)
+    if selector:
+        found = parse(selector).filter(found)
+    _remember(_results, key, objs, tuple(found))
+    return self.newObject(list(found))
+
+
+@contextlib.contextmanager
+def memoised():
+    """
+    Memoises cq.Workplane selections inside the with block. Blocks can be
+    nested, the outermost one puts the original method back.
+    """
+    global _original, _depth
+    if _depth == 0:
+        _original = cq.Workplane._selectObjects
+        cq.Workplane._selectObjects = _select_objects
+    _depth += 1
+    try:
+        yield stats
+    finally:
+        _depth -= 1
+        if _depth == 0:
+            cq.Workplane._selectObjects = _original
+            _original = None
+            clear()
+
+
+def clear():
+    _results.clear()
+    _indexes.clear()
@@ -0,0 +1,269 @@
+"""
+Solving assembly constraints, keeping the solved locations in the cache.
+
+The key for a solve is a hash of the constraint set: the names of the
+constrained objects, the constraint kinds and parameters and the geometry
+the constraints were made from (as the points, directions and planes the
+solver gets), plus the bounding box of each part, which sets the solver's
+scale, and the locations of the Fixed parts, which the others are solved
+around. If none of that has changed the saved locations are used and the
+solver isn't run at all. If it has changed, the solver starts from the
+locations saved the last time this assembly (by name) was solved, which
+are usually very close to the answer.
+"""
+
+import json
+import math
+import time
+import cadquery as cq
+from OCP.gp import gp_Dir, gp_Pnt, gp_Trsf, gp_Vec
+import cache
+
+
+def _floats(marker):
+    """
+    Returns the numbers that make up a solver marker (gp_Pnt, gp_Dir, gp_Pln
+    or gp_Lin). Unary constraints like Fixed have None.
+    """
+    if marker is None:
+        return []
+    if hasattr(marker, "X"):
+        return [marker.X(), marker.Y(), marker.Z()]
+    if hasattr(marker, "Axis"):
+        ax = marker.Axis()
+        return _floats(ax.Location()) + _floats(ax.Direction())
+    if hasattr(marker, "Position"):
+        return _floats(marker.Position().Location()) + _floats(
+            marker.Position().Direction()
+        )
+    raise ValueError(f"don't know how to hash solver marker {marker}")
+
+
+def loc_to_json(loc):
+    """
+    A cq.Location as a list of the 3 rows of its transformation matrix.
+    """
+    trsf = loc.wrapped.Transformation()
+    return [[trsf.Value(r, c) for c in range(1, 5)] for r in range(1, 4)]
+
+
+def loc_from_json(rows):
+    trsf = gp_Trsf()
+    trsf.SetValues(*rows[0], *rows[1], *rows[2])
+    return cq.Location(trsf)
+
+
+# {assembly name: {"start": "cold", "warm" or "saved", "iterations": int,
+# "time": seconds, "status": the solver's return status, "objective": [the
+# objective after each iteration], "residuals": see residuals()}} for the
+# last solve of each assembly
+stats = {}
+
+# residuals bigger than this (mm or degrees) get a warning after each solve
+residual_tol = 1e-4
+
+
+def _bounds(child):
+    """
+    The bounding box of a child of an assembly, in its own coordinates.
+    """
+    bb = child.toCompound().located(cq.Location()).BoundingBox()
+    return [
+        round(v, 6) for v in (bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax)
+    ]
+
+
+def fixed(assy):
+    """
+    The names of the children of assy with a Fixed constraint, the solver
+    leaves them where they were put.
+    """
+    return {c.objects[0] for c in assy.constraints if c.kind == "Fixed"}
+
+
+def constraint_key(assy):
+    """
+    Hash of the constraint set, part geometry and Fixed part locations of
+    assy.
+    """
+    locked = fixed(assy)
+    problem = {
+        "parts": {
+            name: _bounds(child)
+            for name, child in sorted((ch.name, ch) for ch in assy.children)
+        },
+        "fixed": {
+            ch.name: [[round(v, 9) for v in row] for row in loc_to_json(ch.loc)]
+            for ch in assy.children
+            if ch.name in locked
+        },
+        "constraints": [],
+    }
+    for c in assy.constraints:
+        pods = []
+        for markers, kind, param in c.toPODs():
+            pods.append([[_floats(m) for m in markers], kind, repr(param)])
+        problem["constraints"].append([list(c.objects), c.kind, pods])
+    return cache.key("solve", cq.__version__, json.dumps(problem))
+
+
+def _apply(assy, locs):
+    """
+    Sets the location of each child of assy that's in locs, apart from the
+    Fixed ones, returns True if any were.
+    """
+    found = False
+    locked = fixed(assy)
+    for child in assy.children:
+        if child.name in locs and child.name not in locked:
+            child.loc = loc_from_json(locs[child.name])
+            found = True
+    return found
+
+
+def solve(assy, warm=True, verbosity=0):
+    """
+    Solves assy's constraints, or applies the saved solution if the constraint
+    set and parts haven't changed since it was solved. With warm=True the
+    solver starts from the last saved solution for an assembly with this
+    name. verbosity is passed on to IPOPT, 5 prints every iteration. Prints
+    and records the iteration count, objective and time in stats, and warns
+    about any constraint left with a residual over residual_tol. Returns
+    assy.
+    """
+    k = constraint_key(assy)
+    hit = cache.read(k)
+    if hit is not None:
+        _apply(assy, json.loads(hit[0]))
+        stats[assy.name] = {
+            "start": "saved",
+            "iterations": 0,
+            "time": 0.0,
+            "status": "saved",
+            "objective": [],
+        }
+        print(f"solve: {assy.name} unchanged, using saved locations")
+        _check(assy)
+        return assy
+    last_key = cache.key("last solve", assy.name)
+    start = "cold"
+    if warm:
+        last = cache.read(last_key)
+        if last is not None and _apply(assy, json.loads(last[0])):
+            start = "warm"
+    t0 = time.perf_counter()
+    assy.solve(verbosity)
+    elapsed = time.perf_counter() - t0
+    result = getattr(assy, "_solve_result", None) or {}
+    iterations = result.get("iter_count")
+    stats[assy.name] = {
+        "start": start,
+        "iterations": iterations,
+        "time": elapsed,
+        "status": result.get("return_status"),
+        "objective": list(result.get("iterations", {}).get("obj", [])),
+    }
+    print(
+        f"solve: {assy.name} {start} start, {iterations} iterations, "
+        f"{elapsed:.3f} s"
+    )
+    if not result.get("success", True):
+        print(f"solve: warning, {assy.name} ended with {result['return_status']}")
+    _check(assy)
+    locs = json.dumps({ch.name: loc_to_json(ch.loc) for ch in assy.children})
+    cache.write(k, locs.encode(), assembly=assy.name)
+    cache.write(last_key, locs.encode(), assembly=assy.name)
+    return assy
+
+
+def _check(assy):
+    """
+    Records the residuals of assy in stats and warns about the ones over
+    residual_tol.
+    """
+    found = residuals(assy)
+    stats[assy.name]["residuals"] = found
+    for description, residual, unit in found:
+        if residual > residual_tol:
+            print(
+                f"solve: warning, {assy.name} {description} is off by "
+                f"{residual:.3g} {unit}"
+            )
+
+
+def _residual(markers, kind, param, trsfs):
+    """
+    The residual of one simple constraint, in mm or degrees, using the same
+    definitions as the cost functions in cadquery's solver. Returns None for
+    constraints that don't have one (Fixed, FixedRotation).
+    """
+    ms = [m.Transformed(t) if m is not None else None for m, t in zip(markers, trsfs)]
+    if kind == "Point":
+        return abs(ms[0].Distance(ms[1]) - (param or 0)), "mm"
+    if kind == "Axis":
+        angle = ms[0].Angle(ms[1])
+        target = math.pi if param is None else param
+        return math.degrees(abs(angle - target)), "deg"
+    if kind == "PointInPlane":
+        pln = ms[1]
+        normal = pln.Axis().Direction()
+        offset = gp_Vec(pln.Location(), ms[0]).Dot(gp_Vec(normal))
+        return abs(offset - (param or 0)), "mm"
+    if kind == "PointOnLine":
+        return abs(ms[1].Distance(ms[0]) - (param or 0)), "mm"
+    if kind == "FixedPoint":
+        return ms[0].Distance(gp_Pnt(*param)), "mm"
+    if kind == "FixedAxis":
+        return math.degrees(ms[0].Angle(gp_Dir(*param))), "deg"
+    return None
+
+
+def residuals(assy):
+    """
+    Returns a list of (description, residual, unit) for every simple
+    constraint in assy at the current locations. Compound constraints like
+    Plane show up as one entry per part, eg. "clamp/spindle Plane (Point)".
+    """
+    out = []
+    for c in assy.constraints:
+        trsfs = [
+            (cq.Location() if name == assy.name else assy.objects[name].loc)
+            .wrapped.Transformation()
+            for name in c.objects
+        ]
+        for markers, kind, param in c.toPODs():
+            result = _residual(markers, kind, param, trsfs)
+            if result is None:
+                continue
+            description = "/".join(c.objects) + " " + c.kind
+            if kind != c.kind:
+                description += f" ({kind})"
+            out.append((description, *result))
+    return out
+
+
+def report(assy, tol=None):
+    """
+    Prints how the last solve of assy went (see stats) and the residual of
+    every constraint in assy, marking those bigger than tol (residual_tol by
+    default). Returns True if they're all within tol.
+    """
+    if tol is None:
+        tol = residual_tol
+    ok = True
+    last = stats.get(assy.name)
+    if last is not None:
+        print(
+            f"solve of {assy.name}: {last['start']} start, {last['status']}, "
+            f"{last['iterations']} iterations, {last['time']:.3f} s"
+        )
+        for i, objective in enumerate(last["objective"]):
+            print(f"    iteration {i:3} objective {objective:12.6g}")
+    print(f"residuals for {assy.name}:")
+    for description, residual, unit in residuals(assy):
+        flag = ""
+        if residual > tol:
+            flag = "  <-- over tolerance"
+            ok = False
+        print(f"    {description:40} {residual:12.6g} {unit}{flag}")
+    return ok
@@ -1,25 +1,37 @@
-import importlib
 import cadquery as cq
+import deps
 import dims
-importlib.reload(dims)
 
-# origin is the bottom of the clamping range
-spindle = (
-    cq
-    .Workplane()
-    .workplane(offset=-dims.spindle.body.clamp_end_offset)
-    .circle(dims.spindle.body.diam / 2)
-    .extrude(dims.spindle.body.length)
-    .faces("<Z")
-    .workplane()
-    .circle(dims.spindle.bearing_cap.diam / 2)
-    .extrude(dims.spindle.bearing_cap.height)
-    .faces("<Z")
-    .workplane()
-    .circle(dims.spindle.shaft.diam / 2)
-    .extrude(dims.spindle.shaft.length)
-    .faces("<Z")
-    .workplane()
-    .polygon(6, dims.spindle.nut.diam)
-    .extrude(dims.spindle.nut.length)
-)
+
+@deps.memoise(dims)
+def make(dims=dims):
+    """
+    A stand in for the spindle, for checking clearances.
+    """
+    # origin is the bottom of the clamping range
+    spindle = (
+        cq
+        .Workplane()
+        .workplane(offset=-dims.spindle.body.clamp_end_offset)
+        .circle(dims.spindle.body.diam / 2)
+        .extrude(dims.spindle.body.length)
+        .faces("<Z")
+        .workplane()
+        .circle(dims.spindle.bearing_cap.diam / 2)
+        .extrude(dims.spindle.bearing_cap.height)
+        .faces("<Z")
+        .workplane()
+        .circle(dims.spindle.shaft.diam / 2)
+        .extrude(dims.spindle.shaft.length)
+        .faces("<Z")
+        .workplane()
+        .polygon(6, dims.spindle.nut.diam)
+        .extrude(dims.spindle.nut.length)
+    )
+    return spindle
+
+
+def __getattr__(name):
+    if name == "spindle":
+        return make()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,120 @@
+"""
+Where the time goes before the first part shows up.
+
+    python startup.py                    # import times and time to first geometry
+    python startup.py --top 25 dims build assembly
+    python startup.py --part brace
+
+Each module is imported in a fresh interpreter with python -X importtime and
+the slowest imports it pulled in are listed, by their own time and including
+everything they imported. Then a cached part is loaded three ways: in a fresh
+process that imports build, in a fresh process that asks the warm worker (see
+worker.py) and, for reference, the worker's own time for the request. All
+times are wall clock, including starting the interpreter.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+default_modules = ["dims", "build", "cache", "selection", "assembly"]
+
+
+def import_times(module):
+    """
+    Imports module in a fresh interpreter. Returns a list of (name, self
+    seconds, cumulative seconds) for every module it imported, in import
+    order.
+    """
+    code = f"import {module}"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=here,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr}")
+    out = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        out.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6))
+    return out
+
+
+def _wall(code):
+    t0 = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code], cwd=here, check=True, capture_output=True
+    )
+    return time.perf_counter() - t0
+
+
+def first_geometry(name):
+    """
+    Returns {how: seconds} to get the named part, which should already be
+    in the cache, in a new process.
+    """
+    import worker
+
+    # make sure it's cached and the worker is up, neither is being timed
+    worker.part(name)
+    out = {
+        "python": _wall("pass"),
+        "import build, build.part": _wall(f"import build; build.part({name!r})"),
+        "worker.part": _wall(f"import worker; worker.part({name!r})"),
+    }
+    t0 = time.perf_counter()
+    reply = worker.part(name)
+    out["worker.part, in the worker"] = reply["time"]
+    out["worker.part, round trip"] = time.perf_counter() - t0
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        help=f"modules to profile (default {' '.join(default_modules)})",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="imports to list per module"
+    )
+    parser.add_argument(
+        "--part", default="spindle", help="part to time the first geometry of"
+    )
+    parser.add_argument(
+        "--no-worker",
+        action="store_true",
+        help="skip the time to first geometry, which starts a worker",
+    )
+    args = parser.parse_args(argv)
+
+    for module in args.modules or default_modules:
+        times = import_times(module)
+        total = times[-1][2] if times else 0.0
+        names = {name for name, _, _ in times}
+        heavy = [n for n in ("cadquery", "OCP", "vtk", "scipy") if n in names]
+        print(
+            f"import {module}: {total:.3f} s, "
+            f"pulls in {', '.join(heavy) or 'nothing heavy'}"
+        )
+        print(f"    {'module':40} {'self s':>8} {'cumul s':>8}")
+        for name, own, cumulative in sorted(times, key=lambda t: -t[1])[:args.top]:
+            print(f"    {name:40} {own:8.3f} {cumulative:8.3f}")
+    if not args.no_worker:
+        print(f"first geometry, {args.part} from the cache:")
+        for how, seconds in first_geometry(args.part).items():
+            print(f"    {how:40} {seconds:8.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Build the parts for lots of variations of the values in dims.py.
+
+    python sweep.py vac.hose.od=45,52 magnet.diam=3.9,5     # every combination
+    python sweep.py --list variants.json                     # [{"vac.port.rad": 20}, ...]
+    python sweep.py chimney.midprofile.od=40,47 --parts chimney -o results.csv
+
+Overrides are applied to the assignments in dims.py before it runs, so values
+derived from a swept one follow it, eg. sweeping vac.hose.od changes
+vac.hose.socket.od too. Any path that dims.py assigns directly can be swept.
+
+Only the parts that read a value that changes are built (see build.py for how
+reads are tracked), and variants that give a part exactly the same values
+share one build. Builds go through the cache in build.py, so they're also
+reused between runs and by assembly.py, but they don't touch the record of
+what each part read when it was last built from dims.py itself. Each build
+records whether it worked, how long it took (not counting importing
+CadQuery) and the volume and bounding box of the result. A variant that
+leaves a swept part the same as dims.py (eg. one that includes the value in
+the file) still gets a row for it, marked baseline, with the part as built
+from dims.py.
+"""
+
+import argparse
+import ast
+import concurrent.futures
+import csv
+import importlib
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+import types
+import build
+import dims
+
+
+def _dotted(node):
+    """
+    The dotted path of an assignment target like vac.hose.od, or None.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        if base is not None:
+            return base + "." + node.attr
+    return None
+
+
+def dims_code(overrides):
+    """
+    Compiles dims.py with the value of each assignment to a path in
+    overrides replaced. Raises ValueError for paths dims.py never assigns.
+    """
+    with open(dims.__file__) as f:
+        tree = ast.parse(f.read(), dims.__file__)
+    found = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            path = _dotted(target)
+            if path in overrides:
+                value = ast.parse(repr(overrides[path]), mode="eval").body
+                node.value = ast.copy_location(value, node.value)
+                found.add(path)
+    missing = set(overrides) - found
+    if missing:
+        raise ValueError(f"dims.py doesn't assign {', '.join(sorted(missing))}")
+    return compile(ast.fix_missing_locations(tree), dims.__file__, "exec")
+
+
+def apply(overrides):
+    """
+    Re-runs dims.py in place with overrides, importlib.reload(dims) goes back
+    to the values in the file.
+    """
+    exec(dims_code(overrides), vars(dims))
+
+
+def variant_dims(overrides):
+    """
+    A separate module with dims.py run with overrides, dims itself is left
+    alone.
+    """
+    module = types.ModuleType("dims")
+    module.__file__ = dims.__file__
+    exec(dims_code(overrides), vars(module))
+    return module
+
+
+def grid(axes):
+    """
+    Every combination of the values in axes, {path: [values]}. Returns a list
+    of {path: value}.
+    """
+    paths = list(axes)
+    return [
+        dict(zip(paths, values))
+        for values in itertools.product(*(axes[p] for p in paths))
+    ]
+
+
+def _metrics(wp):
+    shape = wp.val()
+    bb = shape.BoundingBox()
+    return {
+        "valid": shape.isValid(),
+        "volume": shape.Volume(),
+        "bbox": [bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax],
+    }
+
+
+def _init_worker():
+    # so the first build in each worker isn't timed with the import in it
+    import cadquery  # noqa: F401
+
+
+def _build(name, overrides):
+    """
+    Builds one part with overrides applied to dims. Kernel failures are
+    recorded rather than raised.
+    """
+    apply(overrides)
+    t0 = time.perf_counter()
+    try:
+        wp, manifest_key, _ = build._lookup(name)
+        cached = wp is not None
+        if not cached:
+            # the manifest is for the values in dims.py, leave it alone
+            wp = build._rebuild(name, manifest_key, record=False)
+        out = {"status": "ok", "cached": cached, **_metrics(wp)}
+    except Exception as e:
+        out = {"status": f"failed: {type(e).__name__}: {e}", "cached": False}
+    out["time"] = time.perf_counter() - t0
+    return out
+
+
+def plan(variants, names=None):
+    """
+    Works out which builds the variants need. Returns {(part name, overrides
+    as a json string): [indexes of the variants that share the build]}, with
+    only the parts that see a different value to the ones in dims.py.
+    """
+    if names is None:
+        names = list(build.parts)
+    # the manifests say which values each part reads, so every part needs
+    # to have been built once
+    build.build(names)
+    reads = {name: build.dependencies(name) for name in names}
+    base = {name: build.dims_values(reads[name]) for name in names}
+    builds = {}
+    for i, overrides in enumerate(variants):
+        module = variant_dims(overrides)
+        for name in names:
+            values = build.dims_values(reads[name], module)
+            if values == base[name]:
+                continue
+            # only the overrides this part can see, so variants that differ
+            # in values it doesn't read end up as the same build
+            key = (name, json.dumps(values, sort_keys=True))
+            builds.setdefault(key, []).append(i)
+    return builds
+
+
+def run(variants, names=None, jobs=1):
+    """
+    Builds the parts affected by each variant, returns a list of result
+    rows, one per (variant, part) for every part that any of the variants
+    changes (every part in names if none of them do).
+    """
+    if names is None:
+        names = list(build.parts)
+    builds = plan(variants, names)
+    order = list(build.parts)
+    swept = sorted({name for name, _ in builds}, key=order.index) or names
+    # before any overrides are applied, these are all in the cache after
+    # plan()
+    base = build.build(swept)
+    print(
+        f"sweep: {len(variants)} variants need {len(builds)} builds",
+        file=sys.stderr,
+    )
+    used = {i for idxs in builds.values() for i in idxs}
+    for i in sorted(set(range(len(variants))) - used):
+        print(f"sweep: variant {i} doesn't change any parts", file=sys.stderr)
+    # each build runs with the overrides of the first variant that needs it
+    todo = [(name, variants[idxs[0]]) for (name, _), idxs in builds.items()]
+    if jobs > 1 and len(todo) > 1:
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(todo)),
+            mp_context=context,
+            initializer=_init_worker,
+        ) as pool:
+            results = list(pool.map(_build, *zip(*todo)))
+    else:
+        try:
+            results = [_build(name, overrides) for name, overrides in todo]
+        finally:
+            importlib.reload(dims)
+    rows = []
+    for ((name, _), idxs), result in zip(builds.items(), results):
+        for i in idxs:
+            rows.append(
+                {"variant": i, "overrides": variants[i], "part": name, **result}
+            )
+    changed = {(r["variant"], r["part"]) for r in rows}
+    baseline = {name: _metrics(base[name]) for name in swept}
+    for i, overrides in enumerate(variants):
+        for name in swept:
+            if (i, name) in changed:
+                continue
+            rows.append(
+                {
+                    "variant": i,
+                    "overrides": overrides,
+                    "part": name,
+                    "status": "baseline",
+                    "cached": True,
+                    "time": 0.0,
+                    **baseline[name],
+                }
+            )
+    return sorted(rows, key=lambda r: (r["variant"], order.index(r["part"])))
+
+
+def _ok(row):
+    return row["status"] in ("ok", "baseline")
+
+
+def print_table(rows):
+    print(
+        f"{'#':>3} {'part':10} {'status':10} {'time s':>8} {'volume':>12} "
+        f"{'size':24} overrides"
+    )
+    for r in rows:
+        status = r["status"] if _ok(r) else "FAILED"
+        if r["cached"] and r["status"] == "ok":
+            status += " (cache)"
+        volume = size = ""
+        if "volume" in r:
+            volume = f"{r['volume']:12.1f}"
+            bb = r["bbox"]
+            size = " x ".join(f"{bb[i + 3] - bb[i]:.1f}" for i in range(3))
+            if not r["valid"]:
+                status = "invalid"
+        overrides = ", ".join(f"{k}={v!r}" for k, v in r["overrides"].items())
+        print(
+            f"{r['variant']:3} {r['part']:10} {status:10} {r['time']:8.3f} "
+            f"{volume:>12} {size:24} {overrides}"
+        )
+    for r in rows:
+        if not _ok(r):
+            print(f"variant {r['variant']} {r['part']}: {r['status']}")
+
+
+def write_csv(rows, path):
+    fields = ["variant", "overrides", "part", "status", "cached", "time"]
+    fields += ["valid", "volume", "bbox"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({**r, "overrides": json.dumps(r["overrides"])})
+
+
+def _parse_axis(text):
+    """
+    "vac.hose.od=45,52" or "dims.spacing=[(1, 2), (3, 4)]" to (path, values).
+    """
+    path, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected path=values, got {text!r}")
+    if values.lstrip().startswith("["):
+        return path, ast.literal_eval(values)
+    return path, [ast.literal_eval(v) for v in values.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "axes",
+        nargs="*",
+        type=_parse_axis,
+        help="path=value,value,... every combination is built",
+    )
+    parser.add_argument(
+        "--list", help="json file with a list of {path: value} variants"
+    )
+    parser.add_argument(
+        "--parts", nargs="+", help="only these parts (default all that change)"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="worker processes"
+    )
+    parser.add_argument("-o", "--out", help="write the results to this csv file")
+    args = parser.parse_args(argv)
+
+    variants = grid(dict(args.axes)) if args.axes else []
+    if args.list:
+        with open(args.list) as f:
+            variants += json.load(f)
+    if not variants:
+        parser.error("nothing to sweep, give some path=values or --list")
+    for overrides in variants:
+        try:
+            dims_code(overrides)
+        except ValueError as e:
+            parser.error(str(e))
+    rows = run(variants, args.parts, args.jobs or multiprocessing.cpu_count())
+    print_table(rows)
+    if args.out:
+        write_csv(rows, args.out)
+        print(f"wrote {args.out}")
+    return 0 if all(_ok(r) for r in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
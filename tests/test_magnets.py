@@ -0,0 +1,23 @@
+import importlib
+import pytest
+import magnets
+
+
+@pytest.mark.parametrize(
+    "first, second, cutter",
+    [
+        ("vac_brack", "vac", magnets.slot),
+        ("chimney", "brace", magnets.mountface_slot),
+    ],
+)
+def test_mating_parts_share_cutter(first, second, cutter):
+    a = importlib.import_module(first)
+    b = importlib.import_module(second)
+    cutter.cache_clear()
+    a.make.cache_clear()
+    b.make.cache_clear()
+    a.make()
+    b.make()
+    info = cutter.cache_info()
+    assert info.misses == 1
+    assert info.hits >= 1
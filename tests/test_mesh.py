@@ -0,0 +1,60 @@
+import pytest
+import cadquery as cq
+from OCP.BRepTools import BRepTools
+import cache
+import mesh
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "directory", str(tmp_path))
+
+
+def _box():
+    return (
+        cq.Workplane()
+        .box(80, 40, 20)
+        .faces(">Z")
+        .workplane()
+        .hole(12)
+        .edges("|Z")
+        .fillet(3)
+        .val()
+    )
+
+
+def _loft():
+    # B-spline faces that the mesher can't get within the deflection
+    return (
+        cq.Workplane()
+        .circle(20)
+        .workplane(offset=40)
+        .transformed(rotate=(20, 0, 30))
+        .rect(15, 30)
+        .workplane(offset=30)
+        .circle(8)
+        .loft()
+        .val()
+    )
+
+
+def _shown_as_is(shape):
+    viewer = mesh.deflection(shape, mesh.viewer_deviation)
+    return BRepTools.Triangulation_s(shape.wrapped, viewer, True)
+
+
+@pytest.mark.parametrize("make", [_box, _loft])
+def test_attached_mesh_is_fine_enough_for_the_viewer(make):
+    shape = make()
+    assert not _shown_as_is(shape)
+    mesh.attach(shape)
+    assert _shown_as_is(shape)
+
+
+@pytest.mark.parametrize("make", [_box, _loft])
+def test_cached_mesh_is_fine_enough_for_the_viewer(make):
+    mesh.attach(make())
+    shape = make()
+    level, _ = mesh.attach(shape)
+    assert level in mesh.shown_levels()
+    assert _shown_as_is(shape)
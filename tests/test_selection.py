@@ -0,0 +1,36 @@
+import random
+import pytest
+import cadquery as cq
+import selection
+
+
+def _points(n):
+    rng = random.Random(0)
+    return [tuple(rng.uniform(-15, 15) for _ in range(3)) for _ in range(n)]
+
+
+def _nearest(shape, pnt):
+    return shape.edges(cq.NearestToPointSelector(pnt)).val()
+
+
+def test_few_queries_stay_numpy():
+    box = cq.Workplane().box(10, 20, 30)
+    index = selection.NearestIndex(box.edges().vals())
+    for p in _points(10):
+        index.nearest(p)
+    assert index.tree is None
+
+
+def test_tree_agrees_with_cadquery(monkeypatch):
+    pytest.importorskip("scipy")
+    monkeypatch.setattr(selection, "tree_after", 5)
+    monkeypatch.setattr(selection, "tree_min", 1)
+    box = cq.Workplane().box(10, 20, 30)
+    points = _points(50)
+    expected = [_nearest(box, p) for p in points]
+    with selection.memoised():
+        got = [_nearest(box, p) for p in points]
+        (index,) = [v for _, v in selection._indexes.values()]
+        assert index.tree is not None
+    for a, b in zip(got, expected):
+        assert a.isSame(b)
@@ -3,7 +3,9 @@ Some helper functions and classes for vac.py.
 """
 
 import cadquery as cq
+import functools
 import math
+import numpy as np
 
 
 # ##########################################################################
@@ -33,6 +35,53 @@ class Vector(cq.Vector):
         return (self.x, self.y)
 
 
+# same tolerance as Workplane.radiusArc, below this the arc is a semicircle
+RADIUS_TOL = 1e-6
+
+
+def radius_arc(startpoint, endpoint, radius, z=0):
+    """
+    Makes the same edge as
+    cq.Workplane(origin=(0, 0, z)).moveTo(*start).radiusArc(end, radius)
+    without the Workplane. Only the x and y of the points are used, a
+    positive radius curves to the left going from start to end.
+    """
+    start = cq.Vector(startpoint.x, startpoint.y, 0)
+    end = cq.Vector(endpoint.x, endpoint.y, 0)
+    # the sagitta, how far the middle of the arc is from the chord
+    length = end.sub(start).Length / 2.0
+    sag = abs(radius)
+    r_2_l_2 = radius ** 2 - length ** 2
+    if abs(r_2_l_2) >= RADIUS_TOL:
+        if r_2_l_2 < 0:
+            raise ValueError(
+                "Arc radius is not large enough to reach the end point."
+            )
+        sag -= math.sqrt(r_2_l_2)
+    if radius < 0:
+        sag = -sag
+    mid = end.add(start).multiply(0.5)
+    sag_vec = end.sub(start).normalized().multiply(abs(sag))
+    if sag > 0:
+        # rotate 90 degrees to the left
+        sag_vec.x, sag_vec.y = -sag_vec.y, sag_vec.x
+    else:
+        sag_vec.x, sag_vec.y = sag_vec.y, -sag_vec.x
+    mid = mid.add(sag_vec)
+    offset = cq.Vector(0, 0, z)
+    return cq.Edge.makeThreePointArc(start + offset, mid + offset, end + offset)
+
+
+@functools.lru_cache(maxsize=256)
+def _upper_edge(x0, y0, x1, y1, radius, z):
+    """
+    radius_arc for UpperWire.edge_idx, cached on the fixed points since the
+    same ones come up every time kidney_and_circle_wires is called with the
+    same arguments, eg. in a sweep over other values.
+    """
+    return radius_arc(Vector(x0, y0), Vector(x1, y1), radius, z)
+
+
 class Arc(cq.Edge):
     """
     All the edges in the kidney shape and circular shape are made of arcs. This
@@ -46,19 +95,12 @@ class Arc(cq.Edge):
             radius=None):
         """
         Creates an arc between startpoint and endpoint.
-        Code is a bit lazy, but whatever, it works.
         """
         if not isinstance(startpoint, Vector):
             startpoint = Vector(startpoint)
         if not isinstance(endpoint, Vector):
-            endpoint = Vector(startpoint)
-        edge = (
-            cq
-            .Workplane()
-            .moveTo(*startpoint.XY())
-            .radiusArc(endpoint.XY(), radius)
-            .val()
-        )
+            endpoint = Vector(endpoint)
+        edge = radius_arc(startpoint, endpoint, radius)
         super().__init__(edge.wrapped)
         # wasn't aware of cq's startPoint method when originally writing this
         self.startpoint = startpoint
@@ -85,13 +127,12 @@ class Wire(cq.Wire):
         are.
         Returns a list of floats between 0 and 1.
         """
-        out = []
-        cumulative_length = 0.0
-        for edge in self.Edges()[:-1]:
-            # Am I sure these edges are sequential?
-            cumulative_length += edge.Length()
-            out.append(edge.Length() / self.Length())
-        return out
+        # each Length() is an integration in OCC, so only do them once
+        total = self.Length()
+        # list_of_edges is in the order they were assembled, so they are
+        # sequential, and it saves exploring the wire for its edges again
+        edges = getattr(self, "list_of_edges", None) or self.Edges()
+        return [edge.Length() / total for edge in edges[:-1]]
 
 
 class UpperWire:
@@ -123,15 +164,11 @@ class UpperWire:
         """
         points = self.points()
         points.append(points[0])
-        out = (
-            cq
-            .Workplane('XY', origin=Vector(0, 0, self.centre.z))
-            .moveTo(points[0].x, points[0].y)
-        )
-        for point in points[1:]:
-            out = out.radiusArc((point.x, point.y), self.radiusArc_radius)
-        out = out.wire().val()
-        return out
+        edges = [
+            radius_arc(start, end, self.radiusArc_radius, self.centre.z)
+            for start, end in zip(points[:-1], points[1:])
+        ]
+        return cq.Wire.assembleEdges(edges)
 
     def edge_idx(self, idx: int):
         """
@@ -141,12 +178,8 @@ class UpperWire:
         """
         start = self.fixed_points[idx]
         end = self.fixed_points[(idx + 1) % 4]
-        out = (
-            cq
-            .Workplane('XY', origin=Vector(0, 0, self.centre.z))
-            .moveTo(start.x, start.y)
-            .radiusArc((end.x, end.y), self.radiusArc_radius)
-            .val()
+        out = _upper_edge(
+            start.x, start.y, end.x, end.y, self.radiusArc_radius, self.centre.z
         )
         assert abs((out.startPoint() - self.fixed_points[idx]).Length) < 1e-4
         assert abs((out.endPoint() - self.fixed_points[(idx + 1) % 4]).Length) < 1e-4
@@ -190,10 +223,18 @@ class UpperWire:
         """
         Adds a point to wire idx at proportion.
         """
+        self.add_intermediate_points(idx, [proportion])
+
+    def add_intermediate_points(self, idx, proportions):
+        """
+        Adds a point to wire idx at each of proportions, making the edge
+        once for all of them.
+        """
         self.check_fixed_points()
         edge = self.edge_idx(idx)
-        new_point = edge.positionAt(proportion)
-        self.intermediate_points[idx].append(new_point)
+        self.intermediate_points[idx].extend(
+            edge.positionAt(proportion) for proportion in proportions
+        )
 
     def check_fixed_points(self):
         if not all(self.fixed_points):
@@ -330,6 +371,162 @@ def normal_points(
     return c_point, k_point
 
 
+# Array versions of the two functions above, for checking lots of candidate
+# hose positions and sizes at once before doing anything in OCC. They give
+# the same answers as the scalar versions, but return plain (n, 3) arrays
+# instead of Vectors along with a mask of the rows that couldn't be worked
+# out. Those rows are nan rather than raising, so one bad candidate doesn't
+# stop the rest.
+def _columns(pos, n):
+    """
+    Splits positions, (3,) or (n, 2) or (n, 3), into x, y and z arrays of
+    length n. z is 0 for 2D positions.
+    """
+    pos = np.atleast_2d(np.asarray(pos, dtype=float))
+    pos = np.broadcast_to(pos, (n, pos.shape[1]))
+    z = pos[:, 2] if pos.shape[1] > 2 else np.zeros(n)
+    return pos[:, 0], pos[:, 1], z
+
+
+def _count(*args):
+    return max(np.atleast_2d(np.asarray(a, dtype=float)).shape[0] for a in args)
+
+
+def tangential_points_array(
+        top_rad,
+        top_pos,
+        port_rad,
+        port_pos,
+        side,
+        ):
+    """
+    tangential_points for n pairs of circles at once. The radii can be
+    scalars or length n arrays, the positions a single point or (n, 2) or
+    (n, 3) arrays.
+    Returns (circle points, kidney points, degenerate), the points as (n, 3)
+    arrays and degenerate a boolean array of the rows that have no answer:
+    either the centres have the same x (atan would divide by zero) or
+    |top_rad - port_rad| is more than the distance between the centres (one
+    circle is inside the other, so asin is outside its domain).
+    """
+    n = max(_count(top_pos, port_pos), np.size(top_rad), np.size(port_rad))
+    x1, y1, _ = _columns(port_pos, n)
+    x2, y2, z2 = _columns(top_pos, n)
+    r1 = np.broadcast_to(np.asarray(port_rad, dtype=float), (n,))
+    r2 = np.broadcast_to(np.asarray(top_rad, dtype=float), (n,))
+    dx = x2 - x1
+    dy = y2 - y1
+    distance = np.hypot(dx, dy)
+    degenerate = (dx == 0) | (np.abs(r2 - r1) > distance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = -np.arctan(dy / dx)
+        beta = np.arcsin((r2 - r1) / distance)
+    # row 0 is the plus case of beta, row 1 the minus case
+    sign = np.array([[1.0], [-1.0]])
+    alpha = gamma - sign * beta
+    x3 = x1 + sign * r1 * np.sin(alpha)
+    y3 = y1 + sign * r1 * np.cos(alpha)
+    x4 = x2 + sign * r2 * np.sin(alpha)
+    y4 = y2 + sign * r2 * np.cos(alpha)
+    # pick the plus or minus case according to side, ties go to minus like in
+    # tangential_points
+    side = side.lower()
+    if side == "+x":
+        use_pos = x3[0] > x3[1]
+    elif side == "-x":
+        use_pos = x3[0] < x3[1]
+    elif side == "+y":
+        use_pos = y3[0] > y3[1]
+    elif side == "-y":
+        use_pos = y3[0] < y3[1]
+    else:
+        raise ValueError(f"side {side} is not recognised")
+    row = np.where(use_pos, 0, 1)
+    cols = np.arange(n)
+    c_points = np.column_stack([x4[row, cols], y4[row, cols], z2])
+    k_points = np.column_stack([x3[row, cols], y3[row, cols], np.zeros(n)])
+    c_points[degenerate] = np.nan
+    k_points[degenerate] = np.nan
+    return c_points, k_points, degenerate
+
+
+def normal_points_array(
+        top_rad,
+        top_pos,
+        inner_kidney_rad,
+        outer_kidney_rad,
+        side,
+        ):
+    """
+    normal_points for n circles at once, the arguments can be scalars or
+    length n arrays (positions (n, 2) or (n, 3)).
+    Returns (circle points, kidney points, degenerate) like
+    tangential_points_array. Circles centred on the z axis are degenerate,
+    there's no line from the origin to normalise.
+    """
+    n = max(
+        _count(top_pos),
+        np.size(top_rad),
+        np.size(inner_kidney_rad),
+        np.size(outer_kidney_rad),
+    )
+    x, y, z = _columns(top_pos, n)
+    top_rad = np.broadcast_to(np.asarray(top_rad, dtype=float), (n,))
+    if side.lower() == "+y":
+        scale = inner_kidney_rad
+        sign = -1
+    else:
+        scale = outer_kidney_rad
+        sign = 1
+    scale = np.broadcast_to(np.asarray(scale, dtype=float), (n,))
+    length = np.hypot(x, y)
+    degenerate = length == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ux = x / length
+        uy = y / length
+    k_points = np.column_stack([ux * scale, uy * scale, np.zeros(n)])
+    c_points = np.column_stack(
+        [x + ux * sign * top_rad, y + uy * sign * top_rad, z]
+    )
+    c_points[degenerate] = np.nan
+    k_points[degenerate] = np.nan
+    return c_points, k_points, degenerate
+
+
+def kidney_and_circle_points(
+        top_rad,
+        top_pos,
+        bot_inner_rad,
+        bot_outer_rad,
+        ):
+    """
+    The 4 tangential and normal point pairs that kidney_and_circle_wires
+    starts from, for n candidate hoses at once. Takes the same arguments, as
+    scalars or length n arrays (top_pos (n, 3)).
+    Returns (circle points, kidney points, ok). The points are (n, 4, 3)
+    arrays in the order the fixed points go into the circle wire: inner
+    normal, tangent 0, outer normal, tangent 1. ok is False for the
+    candidates where any of them couldn't be worked out.
+    """
+    bot_inner_rad = np.asarray(bot_inner_rad, dtype=float)
+    bot_outer_rad = np.asarray(bot_outer_rad, dtype=float)
+    port_rad = (bot_outer_rad - bot_inner_rad) / 2
+    port_centre = (bot_inner_rad + bot_outer_rad) / 2
+    zero = np.zeros_like(port_centre)
+    port_pos_x_axis = np.stack(np.broadcast_arrays(port_centre, zero), axis=-1)
+    port_pos_y_axis = np.stack(np.broadcast_arrays(zero, -port_centre), axis=-1)
+    results = [
+        normal_points_array(top_rad, top_pos, bot_inner_rad, bot_outer_rad, "+Y"),
+        tangential_points_array(top_rad, top_pos, port_rad, port_pos_x_axis, "+X"),
+        normal_points_array(top_rad, top_pos, bot_inner_rad, bot_outer_rad, "-Y"),
+        tangential_points_array(top_rad, top_pos, port_rad, port_pos_y_axis, "-Y"),
+    ]
+    c_points = np.stack([r[0] for r in results], axis=1)
+    k_points = np.stack([r[1] for r in results], axis=1)
+    ok = ~np.any([r[2] for r in results], axis=0)
+    return c_points, k_points, ok
+
+
 def kidney_and_circle_wires(
         top_rad,
         top_pos,
@@ -488,6 +685,5 @@ def kidney_and_circle_wires(
     for idx, pnt in enumerate(pnts):
         circle_loop.add_fixed_point(idx, pnt)
     for idx, kwire in enumerate(kidney_loop.wires):
-        for proportion in kwire.proportions():
-            circle_loop.add_intermediate_point(idx, proportion)
+        circle_loop.add_intermediate_points(idx, kwire.proportions())
     return kidney_loop.wire(), circle_loop.wire()
@@ -1,5 +1,10 @@
+import functools
+import hashlib
+import os
 from types import SimpleNamespace as d
 import cadquery as cq
+from OCP.BRepPrimAPI import BRepPrimAPI_MakePrism
+import cache
 
 dims = d()
 dims.outer = d()
@@ -7,21 +12,64 @@ dims.outer.x = 80
 dims.outer.y = 40
 dims.base_depth = 20
 
+dxf_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "C-Beam-DXF.dxf")
 
-def cslot(length=100):
-    out = (
+
+def _outline():
+    """
+    The C-Beam's outer outline as a face, before any slots are cut.
+    """
+    x0 = dims.outer.x / 2
+    x1 = x0 - dims.base_depth
+    return cq.Face.makeFromWires(cq.Wire.makePolygon([
+        cq.Vector(-x0, 0, 0),
+        cq.Vector(x0, 0, 0),
+        cq.Vector(x0, dims.outer.y, 0),
+        cq.Vector(x1, dims.outer.y, 0),
+        cq.Vector(x1, dims.base_depth, 0),
+        cq.Vector(-x1, dims.base_depth, 0),
+        cq.Vector(-x1, dims.outer.y, 0),
+        cq.Vector(-x0, dims.outer.y, 0),
+        cq.Vector(-x0, 0, 0),
+    ]))
+
+
+def _slot():
+    """
+    The cross section of a single slot, with the mouth at the origin and the
+    slot heading into the profile along +Y.
+    """
+    cutter = (
         cq
         .Workplane()
-        .tag("base")
-        .box(dims.outer.x, dims.base_depth, length, centered=(True, False, False))
-        .workplaneFromTagged("base")
-        .center(dims.outer.x / 2 - dims.base_depth / 2, 0)
-        .box(dims.base_depth, dims.outer.y, length, centered=(True, False, False))
-        .workplaneFromTagged("base")
-        .center(-dims.outer.x / 2 + dims.base_depth / 2, 0)
-        .box(dims.base_depth, dims.outer.y, length, centered=(True, False, False))
-        .tag("unslotted")
+        .tag("centered")
+        .hLine(9.16 / 2)
+        .polarLine(4, 45 + 90)
+        .hLineTo(0)
+        .mirrorY()
+        .extrude(1)
+        .workplaneFromTagged("centered")
+        .center(0, 1.8 + 1.5 / 2)
+        .rect(11, 1.5, centered=True)
+        .extrude(1)
+        .workplaneFromTagged("centered")
+        .center(0, 1.8 + 4.3 / 2)
+        .rect(6.5, 4.3, centered=True)
+        .extrude(1)
+        .edges("|Z")
+        .edges(cq.NearestToPointSelector((6.5 / 2, 1.8 + 1.5, 0)))
+        .chamfer(2)
+        .edges("|Z")
+        .edges(cq.NearestToPointSelector((-6.5 / 2, 1.8 + 1.5, 0)))
+        .chamfer(2)
     )
+    return cutter.faces("<Z").val()
+
+
+def _slot_positions():
+    """
+    (x, y, rotation) of the mouth of each slot.
+    """
     points = []
     for idx in range(4):
         points.append((
@@ -36,74 +84,94 @@ def cslot(length=100):
                 , dims.base_depth / 2 + idx * dims.base_depth
                 , 180 - 90 * side
             ))
-    for xval, yval, rot in points:
-        out = out.cut(
-            cq
-            .Workplane()
-            .center(xval, yval)
-            .tag("centered")
-            .hLine(9.16 / 2)
-            .polarLine(4, 45 + 90)
-            .hLineTo(0)
-            .mirrorY()
-            .extrude(length)
-            .workplaneFromTagged("centered")
-            .center(0, 1.8 + 1.5 / 2)
-            .rect(11, 1.5, centered=True)
-            .extrude(length)
-            .workplaneFromTagged("centered")
-            .center(0, 1.8 + 4.3 / 2)
-            .rect(6.5, 4.3, centered=True)
-            .extrude(length)
-            .edges("|Z")
-            .edges(cq.NearestToPointSelector((xval + 6.5 / 2, yval + 1.8 + 1.5, 0)))
-            .chamfer(2)
-            .edges("|Z")
-            .edges(cq.NearestToPointSelector((xval - 6.5 / 2, yval + 1.8 + 1.5, 0)))
-            .chamfer(2)
-            .rotate((xval, yval, 0), (xval, yval, 1), rot)
-        )
-    return out
+    return points
 
 
-def cbeam_dxf(length=100):
+@functools.lru_cache(maxsize=None)
+def _profile():
     """
-    Alternate to the above method, but this one imports a dxf for the profile.
+    The slotted cross section as a face. Doesn't depend on length, so it's
+    only made once.
     """
-    # I'm actually laughing out loud at this process.
-    # create the base face and tag it as unslotted
-    part = (
+    slot = _slot()
+    # located copies, all sharing the one underlying face
+    slots = [
+        slot.moved(cq.Location(cq.Vector(x, y, 0), cq.Vector(0, 0, 1), rot))
+        for x, y, rot in _slot_positions()
+    ]
+    return _outline().cut(*slots).clean()
+
+
+def _extrude(face, length):
+    return cq.Shape.cast(
+        BRepPrimAPI_MakePrism(face.wrapped, cq.Vector(0, 0, length).wrapped).Shape()
+    )
+
+
+def _unslotted(length):
+    """
+    A cq.Workplane holding the plain outer shape of the profile, tagged
+    "unslotted" for use in assembly constraints.
+    """
+    return (
         cq
         .Workplane()
         .tag("base")
-        .box(
-            dims.outer.x, dims.base_depth, length, centered=(True, False, False)
-        )
-        .workplaneFromTagged("base")
-        .center(dims.outer.x / 2 - dims.base_depth / 2, 0)
-        .box(
-            dims.base_depth, dims.outer.y, length, centered=(True, False, False)
-        )
-        .workplaneFromTagged("base")
-        .center(-dims.outer.x / 2 + dims.base_depth / 2, 0)
-        .box(
-            dims.base_depth, dims.outer.y, length, centered=(True, False, False)
-        )
+        .newObject([_extrude(_outline(), length)])
         .tag("unslotted")
     )
-    # import dxf
-    imported = (
-        cq.importers.importDXF('C-Beam-DXF.dxf')
-        .translate((0, dims.base_depth, 0))
-        .wires()
-        .toPending()
-        .extrude(length)
+
+
+def cslot(length=100):
+    """
+    C-Beam made from a parametric profile. The profile is made once and then
+    extruded, so long rails cost the same as short ones.
+    """
+    solid = _extrude(_profile(), length)
+    return _unslotted(length).newObject(solid.Solids())
+
+
+@functools.lru_cache(maxsize=None)
+def _dxf_profile(digest):
+    """
+    The profile faces from the dxf whose contents hash to digest, parsed once
+    per process and kept in the on disk cache between runs.
+    """
+    k = cache.key(
+        "cbeam_dxf profile", cq.__version__, digest, repr(dims.base_depth)
     )
-    # completely replace everything I just made with the imported version, but
-    # this will still preserve the unslotted tag, so I can use that in my
-    # assembly constraints
-    part = part.newObject(imported.objects)
-    return part
+    profile = cache.load_shape(k)
+    if profile is None:
+        faces = (
+            cq.importers.importDXF(dxf_path)
+            .translate((0, dims.base_depth, 0))
+            .wires()
+            .toPending()
+            .extrude(1)
+            .faces("<Z")
+            .vals()
+        )
+        profile = cq.Compound.makeCompound(faces)
+        cache.store_shape(k, profile, part="cbeam_dxf profile")
+    return profile
+
+
+def cbeam_dxf(length=100):
+    """
+    Alternate to the above method, but this one imports a dxf for the profile.
+    The dxf is only parsed when its contents change, after that each call is
+    a single extrude.
+    """
+    with open(dxf_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    solid = _extrude(_dxf_profile(digest), length)
+    # the plain outline is a cheap stand in for the dxf, tagged unslotted so I
+    # can use it in my assembly constraints
+    return _unslotted(length).newObject(solid.Solids())
 
 
-cslot0 = cbeam_dxf()
+def __getattr__(name):
+    # cslot0 used to be made whenever this module was imported
+    if name == "cslot0":
+        return cbeam_dxf()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,212 @@
+"""
+A long running process that keeps CadQuery loaded between builds.
+
+    python worker.py --serve                 # run the worker in this terminal
+    python worker.py brace -f step           # out/brace.step, through the worker
+    python worker.py --stop
+
+Importing CadQuery takes seconds, longer than loading a part from the cache.
+The worker imports it once and then builds or loads parts on request, so
+asking it for a cached part takes a fraction of a second. The client side
+doesn't import CadQuery at all. If no worker is running, the first request
+starts one in the background. Each request reloads dims, so edits to dims.py,
+the part modules and the helpers they use are picked up just like a fresh
+run.
+
+The worker listens on a unix socket in the cache directory and only talks to
+clients that have the key it writes there when it starts.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import cache
+
+
+address = os.path.join(cache.directory, "worker.sock")
+key_path = os.path.join(cache.directory, "worker.key")
+log_path = os.path.join(cache.directory, "worker.log")
+
+
+def _write_key():
+    authkey = os.urandom(32)
+    os.makedirs(cache.directory, exist_ok=True)
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+    return authkey
+
+
+def _read_key():
+    with open(key_path, "rb") as f:
+        return f.read()
+
+
+def _part(name, path=None, fmt=None):
+    import build
+    import cli
+
+    t0 = time.perf_counter()
+    wp = build.build([name])[name]
+    out = {"name": name, "time": time.perf_counter() - t0}
+    if path is None:
+        out["data"], out["layout"] = cache.workplane_to_bytes(wp)
+    else:
+        import cadquery as cq
+
+        fmt = fmt or os.path.splitext(path)[1][1:].lower()
+        cq.exporters.export(wp, path, cli.formats[fmt])
+        out["path"] = path
+    return out
+
+
+def _handle(request):
+    op = request.pop("op")
+    if op == "ping":
+        return {"pid": os.getpid()}
+    if op == "part":
+        return _part(**request)
+    raise ValueError(f"unknown request {op!r}")
+
+
+def serve():
+    """
+    Runs the worker until it's sent a stop request.
+    """
+    # the whole point, get the slow imports out of the way up front
+    import cadquery  # noqa: F401
+    import build  # noqa: F401
+
+    if os.path.exists(address):
+        try:
+            request("ping", start=False)
+        except (OSError, EOFError, AuthenticationError):
+            # left behind by a worker that died
+            os.remove(address)
+        else:
+            print("worker: already running", file=sys.stderr)
+            return
+    authkey = _write_key()
+    with Listener(address, "AF_UNIX", authkey=authkey) as listener:
+        print(f"worker: listening on {address}", file=sys.stderr)
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, AuthenticationError):
+                # a client that didn't have the key
+                continue
+            with conn:
+                try:
+                    req = conn.recv()
+                except EOFError:
+                    continue
+                if req.get("op") == "stop":
+                    conn.send({"ok": True})
+                    break
+                try:
+                    conn.send({"ok": True, **_handle(req)})
+                except Exception as e:
+                    conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+def start():
+    """
+    Starts a worker in the background, its output goes to worker.log in the
+    cache directory.
+    """
+    os.makedirs(cache.directory, exist_ok=True)
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+
+def _connect(start_worker, timeout):
+    try:
+        return Client(address, "AF_UNIX", authkey=_read_key())
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not start_worker:
+            raise
+    start()
+    deadline = time.monotonic() + timeout
+    while True:
+        time.sleep(0.1)
+        try:
+            return Client(address, "AF_UNIX", authkey=_read_key())
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"worker didn't start within {timeout} s, see {log_path}"
+                )
+
+
+def request(op, start=True, timeout=60, **kwargs):
+    """
+    Sends a request to the worker and returns its reply, starting a worker
+    first if there isn't one and start is True. Raises RuntimeError if the
+    request failed in the worker.
+    """
+    with _connect(start, timeout) as conn:
+        conn.send({"op": op, **kwargs})
+        reply = conn.recv()
+    if not reply.pop("ok"):
+        raise RuntimeError(reply["error"])
+    return reply
+
+
+def part(name, path=None, fmt=None):
+    """
+    Has the worker build or load the named part. With path the worker exports
+    it there (in fmt, or going by the extension) and the reply has the path,
+    otherwise the reply has the binary BREP and tag layout for
+    cache.workplane_from_bytes.
+    """
+    return request("part", name=name, path=path, fmt=fmt)
+
+
+def stop():
+    try:
+        request("stop", start=False)
+    except (OSError, EOFError):
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("parts", nargs="*", help="parts to export")
+    parser.add_argument(
+        "-f", "--format", default="brep", help="export format (default brep)"
+    )
+    parser.add_argument(
+        "-o", "--out", default="out", help="output directory (default out)"
+    )
+    parser.add_argument("--serve", action="store_true", help="run the worker")
+    parser.add_argument("--stop", action="store_true", help="stop the worker")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve()
+        return 0
+    if args.stop:
+        print("worker stopped" if stop() else "no worker running")
+        return 0
+    os.makedirs(args.out, exist_ok=True)
+    for name in args.parts:
+        t0 = time.perf_counter()
+        path = os.path.abspath(os.path.join(args.out, f"{name}.{args.format}"))
+        part(name, path, args.format)
+        print(f"wrote {path} in {time.perf_counter() - t0:.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())